@@ -0,0 +1,773 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.I. Mimilakis'
+__copyright__ = 'MacSeNet'
+
+import os, io, subprocess, csv, struct
+import numpy as np
+from sys import platform
+from .profiling import profiled
+
+class AudioIO:
+	""" Class for handling audio input/output operations.
+	    It supports reading and writing of various audio formats
+	    via 'audioRead' & 'audioWrite' methods. Moreover playback
+	    can be performed by using 'sound' method. For formats
+	    different than '.wav' a coder is needed. In this case
+	    libffmpeg is being used, where the absolute path of
+	    the static build should be given to the class variable.
+	    Finally, energy normalisation and anti-clipping methods
+	    are also covered in the last two methods.
+
+		Basic Usage examples:
+		Import the class :
+		from audiocoding import IOMethods as IO
+		-For loading wav files:
+			x, fs = IO.AudioIO.wavRead('myWavFile.wav', mono = True)
+		-For processing long wav files block by block:
+			for x in IO.AudioIO.wavBlocks('myWavFile.wav', 1024, mono = True):
+				...
+		-In case that compressed files are about to be read specify
+			the path to the libffmpeg library by changing the 'pathToffmpeg'
+			variable (or the executable in 'ffmpegBinary') and then type:
+			x, fs = IO.AudioIO.audioRead('myFile.mp3')
+		-For writing wav files:
+			IO.AudioIO.audioWrite(x, fs, 16, 'myNewWavFile.wav', 'wav')
+
+		-For listening wav files:
+			IO.AudioIO.sound(x,fs)
+
+	"""
+    # Normalisation parameters for wavreading and writing
+	normFact = {'int8' : (2**7) -1,
+				'int16': (2**15)-1,
+				'int24': (2**23)-1,
+				'int32': (2**31)-1,
+				'int64': (2**63)-1,
+				'float32': 1.0,
+				'float64': 1.0}
+
+	# Absolute path needed here
+	pathToffmpeg = '/home/mis/Documents/Python/Projects/SourceSeparation/MiscFiles'
+
+	# ffmpeg executable, e.g. 'ffmpeg' from the PATH (if None, the static build in 'pathToffmpeg' is used)
+	ffmpegBinary = None
+
+	# Formats which are decoded/encoded by ffmpeg
+	ffmpegFormats = ('mp3', 'au', 'wma', 'aiff')
+
+	# Number of frames which the PCM decoder and encoder convert at once
+	pcmChunkFrames = 65536
+
+	def __init__(self):
+		pass
+
+	@staticmethod
+	def audioRead(fileName, mono=False, startSec=None, endSec=None, dtype=np.float64):
+		""" Function to load audio files such as *.mp3, *.au, *.wma & *.aiff.
+			They are decoded by ffmpeg, which streams the samples through a pipe
+			straight into memory, without a shell or an intermediate WAV file.
+			The ffmpeg executable is given by 'ffmpegBinary' (or 'pathToffmpeg').
+
+        Args:
+            fileName:       (str)       Absolute filename of WAV file
+            mono:           (bool)      Switch if samples should be converted to mono
+            startSec:       (float)     Segment start time in seconds (if None, segment starts at the beginning of the WAV file)
+            endSec:         (float)     Segment end time in seconds (if None, segment ends at the end of the WAV file)
+            dtype:          (np dtype)  Floating point type of the samples, np.float64 or np.float32
+        Returns:
+            samples:        (np array)  Audio samples (between [-1,1]
+                                        (if stereo: numSamples x numChannels,
+                                        if mono: numSamples)
+            sampleRate:     (float):    Sampling frequency [Hz]
+        """
+
+		# Get the absolute path
+		fileName = os.path.abspath(fileName)
+		if os.path.splitext(fileName)[1][1:].lower() not in AudioIO.ffmpegFormats:
+			raise Exception('This format is not supported.')
+
+		# Decode to 32-bit float WAV on stdout
+		proc = subprocess.run([AudioIO._ffmpeg(), '-v', 'error', '-i', fileName,
+							   '-f', 'wav', '-acodec', 'pcm_f32le', 'pipe:1'],
+							  stdin = subprocess.DEVNULL, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+		if proc.returncode != 0:
+			raise Exception('ffmpeg failed to decode ' + fileName + ': '
+							+ proc.stderr.decode(errors = 'replace'))
+		data = proc.stdout
+		header = AudioIO._parseWAVHeader(io.BytesIO(data), len(data))
+
+		sampleRate = header['sampleRate']
+		startIdx, endIdx = AudioIO._segmentIndices(header['nframes'], sampleRate, startSec, endSec)
+		samples = AudioIO._mapWAVFrames(data, header, startIdx, endIdx)
+		samples = AudioIO._pcm2float(samples, header, dtype = dtype)
+
+		# mono conversion
+		if mono:
+			samples = AudioIO._toMono(samples)
+
+		return samples, sampleRate
+
+	@staticmethod
+	def audioWrite(y, fs, nbits, audioFile, format):
+		""" Write samples to WAV file, or for the other formats pipe
+		them to ffmpeg, which encodes them to the selected format.
+        Args:
+            samples: 	(ndarray / 2D ndarray) (floating point) sample vector
+                    		mono: DIM: nSamples
+                    		stereo: DIM: nSamples x nChannels
+
+            fs: 		(int) Sample rate in Hz
+            nBits: 		(int) Number of bits (for .wav, .aiff & .au)
+            audioFile: 	(string) WAV file name to write
+            format:		(string) Selected format
+            				'mp3' 	: Writes to .mp3
+            				'wma' 	: Writes to .wma
+            				'wav' 	: Writes to .wav
+            				'aiff'	: Writes to .aiff
+            				'au'	: Writes to .au
+		"""
+
+		if (format == 'wav'):
+			AudioIO.wavWrite(y, fs, nbits, audioFile)
+
+		elif format in AudioIO.ffmpegFormats:
+			y = np.ascontiguousarray(y, dtype = '<f4')
+			nchannels = 1 if y.ndim == 1 else y.shape[1]
+			cmd = [AudioIO._ffmpeg(), '-v', 'error', '-y', '-f', 'f32le', '-ar', str(fs),
+				   '-ac', str(nchannels), '-i', 'pipe:0']
+			# Uncompressed formats are written with the requested number of bits
+			if format in ('aiff', 'au'):
+				cmd += ['-acodec', 'pcm_s8' if nbits == 8 else 'pcm_s%dbe' % nbits]
+			cmd.append(audioFile)
+			proc = subprocess.run(cmd, input = memoryview(y).cast('B'),
+								  stdout = subprocess.DEVNULL, stderr = subprocess.PIPE)
+			if proc.returncode != 0:
+				raise Exception('ffmpeg failed to encode ' + audioFile + ': '
+								+ proc.stderr.decode(errors = 'replace'))
+		else :
+			raise Exception('This format is not supported.')
+
+	@staticmethod
+	def _ffmpeg():
+		""" Returns the ffmpeg executable """
+		if AudioIO.ffmpegBinary is not None:
+			return AudioIO.ffmpegBinary
+
+		# Linux
+		if (platform == "linux") or (platform == "linux2"):
+			return os.path.join(AudioIO.pathToffmpeg, 'ffmpeg_linux')
+		# MacOSX
+		elif (platform == "darwin"):
+			return os.path.join(AudioIO.pathToffmpeg, 'ffmpeg_osx')
+		# Add windows support!
+		else :
+			raise Exception('This OS is not supported.')
+
+	@staticmethod
+	def wavRead(fileName, mono=False, startSec=None, endSec=None, integer=False, dtype=np.float64):
+		""" Function to load WAV file. The header is parsed once and only the
+			frames of the requested segment are read, via a memory map of the file.
+
+        Args:
+            fileName:       (str)       Absolute filename of WAV file
+            mono:           (bool)      Switch if samples should be converted to mono
+            startSec:       (float)     Segment start time in seconds (if None, segment starts at the beginning of the WAV file)
+            endSec:         (float)     Segment end time in seconds (if None, segment ends at the end of the WAV file)
+            integer:        (bool)      Switch if the PCM samples should be returned without scaling.
+                                        For 16/32-bit PCM they are then a read-only view into the
+                                        memory-mapped file (no copy); scale them with AudioIO.normFact.
+            dtype:          (np dtype)  Floating point type of the samples, np.float64 or np.float32.
+                                        float32 halves the memory of the samples; it represents
+                                        16 and 24-bit PCM exactly up to the rounding of the scaling
+                                        (relative error below 6e-8), 32-bit PCM to 24 bits.
+        Returns:
+            samples:        (np array)  Audio samples (between [-1,1]
+                                        (if stereo: numSamples x numChannels,
+                                        if mono: numSamples)
+            sampleRate:     (float):    Sampling frequency [Hz]
+        """
+		# The stages are recorded if a profiling.Profiler is active
+		try:
+			header = profiled('_readWAVHeader', AudioIO._readWAVHeader, fileName)
+		except ValueError:
+			header = None
+
+		if header is None or header['formatTag'] not in (1, 3):
+			# Fall back to scipy for formats which cannot be mapped directly
+			samples, sampleRate = profiled('_loadWAVWithScipy', AudioIO._loadWAVWithScipy, fileName)
+			startIdx, endIdx = AudioIO._segmentIndices(samples.shape[0], sampleRate, startSec, endSec)
+			samples = samples[startIdx:endIdx]
+			if samples.dtype.kind == 'f':
+				samples = samples.astype(dtype, copy = False)
+		else:
+			sampleRate = header['sampleRate']
+			startIdx, endIdx = AudioIO._segmentIndices(header['nframes'], sampleRate, startSec, endSec)
+			# The PCM decoder reads 24-bit samples as bytes, without an int32 copy
+			samples = profiled('_mapWAVFrames', AudioIO._mapWAVFrames, fileName, header, startIdx, endIdx, decode = integer)
+			if not integer:
+				samples = profiled('_pcm2float', AudioIO._pcm2float, samples, header, dtype = dtype)
+
+		# mono conversion
+		if mono:
+			samples = profiled('_toMono', AudioIO._toMono, samples)
+
+		return samples, sampleRate
+
+	@staticmethod
+	def _toMono(samples):
+		""" Average the first two channels, integer samples keep their type """
+		if samples.ndim == 2 and samples.shape[1] > 1:
+			if samples.dtype.kind in 'iu':
+				samples = ((samples[:, 0].astype(np.int64) + samples[:, 1]) // 2).astype(samples.dtype)
+			else:
+				samples = (samples[:, 0] + samples[:, 1])*0.5
+
+		return samples
+
+	@staticmethod
+	def wavBlocks(fileName, blockSize, hop=None, mono=False, dtype=np.float64):
+		""" Generator over the blocks of a WAV file, for processing files of any
+			length with constant memory. The file is memory-mapped and each block
+			is converted straight into a preallocated buffer. The blocks can be fed
+			directly into the filter bank, e.g.:
+				MDCTfb.MDCTanastream(AudioIO.wavBlocks('myWavFile.wav', N, mono = True), N, fb)
+
+        Args:
+            fileName:       (str)       Filename of WAV file
+            blockSize:      (int)       Number of samples per block
+            hop:            (int)       Number of samples between the starts of two blocks
+                                        (if None, hop = blockSize, i.e. non-overlapping blocks)
+            mono:           (bool)      Switch if samples should be converted to mono
+            dtype:          (np dtype)  Floating point type of the blocks, np.float64 or np.float32
+        Yields:
+            block:          (np array)  Audio samples between [-1,1]
+                                        (blockSize x numChannels, if mono: blockSize).
+                                        The last block is padded with zeros. The same buffer
+                                        is reused for every block, copy it to keep it.
+        """
+		header = AudioIO._readWAVHeader(fileName)
+		if header['formatTag'] not in (1, 3):
+			raise Exception('This format is not supported.')
+		if hop is None:
+			hop = blockSize
+		nframes = header['nframes']
+		if nframes == 0:
+			return
+		data = AudioIO._mapWAVFrames(fileName, header, 0, nframes, decode = False)
+		nchannels = header['nchannels']
+		buf = np.zeros((blockSize, nchannels), dtype = dtype)
+		if mono:
+			monoBuf = np.empty(blockSize, dtype = dtype)
+		# The 24-bit decoder assembles the samples in this buffer, it is reused for every block
+		scratch = None
+		if data.ndim == 3:
+			scratch = np.zeros((min(AudioIO.pcmChunkFrames, blockSize), nchannels, 4), dtype = np.uint8)
+
+		pin = 0
+		while pin < nframes:
+			pend = min(pin + blockSize, nframes)
+			AudioIO._pcm2float(data[pin:pend], header, out = buf[:pend - pin], scratch = scratch)
+			if pend - pin < blockSize:
+				buf[pend - pin:] = 0.0
+			if not mono:
+				yield buf
+			elif nchannels > 1:
+				np.add(buf[:, 0], buf[:, 1], out = monoBuf)
+				monoBuf *= 0.5
+				yield monoBuf
+			else:
+				monoBuf[:] = buf[:, 0]
+				yield monoBuf
+			pin += hop
+
+	@staticmethod
+	def _segmentIndices(songLenSamples, sampleRate, startSec, endSec):
+		""" Convert segment boundaries in seconds to sample indices and check them.
+			The end index is exclusive, without endSec the segment includes the last sample.
+		"""
+		if startSec is None:
+			startIdx = 0
+		else:
+			startIdx = int(round(startSec*sampleRate))
+		if endSec is None:
+			endIdx = songLenSamples
+		else:
+			endIdx = int(round(endSec*sampleRate))
+		if startIdx < 0 or startIdx > songLenSamples:
+			raise Exception("Segment start sample index out of song boundaries!")
+		if endIdx < startIdx or endIdx > songLenSamples:
+			raise Exception("Segment end sample index out of song boundaries!")
+
+		return startIdx, endIdx
+
+	@staticmethod
+	def _readWAVHeader(fileName):
+		""" Parse the RIFF header of a WAV file, without reading any samples.
+        Args:
+            fileName:       (str)       Filename of WAV file
+        Returns:
+            header:         (dict)      'formatTag' (1: PCM, 3: float), 'nchannels', 'sampleRate',
+                                        'sampwidth' (bytes), 'blockAlign', 'dataOffset' (bytes)
+                                        and 'nframes'
+        """
+		with open(fileName, 'rb') as f:
+			return AudioIO._parseWAVHeader(f, os.fstat(f.fileno()).st_size)
+
+	@staticmethod
+	def _parseWAVHeader(f, fileSize):
+		""" Parse the RIFF header from the file object f of a WAV file with fileSize bytes,
+			see _readWAVHeader.
+		"""
+		header = {}
+		riff = f.read(12)
+		if len(riff) < 12 or riff[0:4] != b'RIFF' or riff[8:12] != b'WAVE':
+			raise ValueError('File is not a RIFF/WAVE file.')
+		while True:
+			chunk = f.read(8)
+			if len(chunk) < 8:
+				raise ValueError('No data chunk found.')
+			chunkId = chunk[0:4]
+			chunkSize = struct.unpack('<I', chunk[4:8])[0]
+			if chunkId == b'fmt ':
+				fmt = f.read(chunkSize)
+				formatTag, nchannels, sampleRate, _, blockAlign, bits = struct.unpack('<HHIIHH', fmt[:16])
+				# WAVE_FORMAT_EXTENSIBLE: the format is given by the sub format GUID
+				if formatTag == 0xFFFE and chunkSize >= 26:
+					formatTag = struct.unpack('<H', fmt[24:26])[0]
+				header.update(formatTag = formatTag, nchannels = nchannels, sampleRate = sampleRate,
+							  sampwidth = blockAlign // nchannels, blockAlign = blockAlign)
+				f.seek(chunkSize % 2, 1)
+			elif chunkId == b'data':
+				if 'blockAlign' not in header:
+					raise ValueError('Data chunk before fmt chunk.')
+				header['dataOffset'] = f.tell()
+				# Streamed files (e.g. from a pipe) may carry a wrong data size, limit it by the file size
+				dataSize = fileSize - header['dataOffset']
+				if chunkSize != 0xFFFFFFFF:
+					dataSize = min(chunkSize, dataSize)
+				header['nframes'] = dataSize // header['blockAlign']
+				break
+			else:
+				f.seek(chunkSize + chunkSize % 2, 1)
+
+		return header
+
+	@staticmethod
+	def _mapWAVFrames(fileName, header, startIdx, endIdx, decode=True):
+		""" Memory-map the frames [startIdx:endIdx] of a WAV file. If fileName is
+			a bytes object holding a complete WAV file, the frames are viewed in it.
+			Returns the unscaled samples as numFrames x numChannels array, which
+			is a read-only view into the file for 8/16/32-bit PCM and float data.
+			24-bit samples are converted to int32, unless decode is False, then
+			the numFrames x numChannels x 3 bytes are returned.
+		"""
+		nchannels = header['nchannels']
+		sampwidth = header['sampwidth']
+		numFrames = endIdx - startIdx
+		if header['formatTag'] == 3:
+			dtype = np.dtype('<f%d' % sampwidth)
+		elif sampwidth == 3:
+			dtype = np.dtype('<u1')
+		else:
+			# 8 bit samples are stored as unsigned ints; others as signed ints.
+			dtype = np.dtype('<%s%d' % ('u' if sampwidth == 1 else 'i', sampwidth))
+		if sampwidth == 3:
+			shape = (numFrames, nchannels, 3)
+		else:
+			shape = (numFrames, nchannels)
+		offset = header['dataOffset'] + startIdx * header['blockAlign']
+		if numFrames == 0:
+			a = np.zeros(shape, dtype = dtype)
+		elif isinstance(fileName, (bytes, bytearray, memoryview)):
+			a = np.frombuffer(fileName, dtype = dtype, count = int(np.prod(shape)), offset = offset).reshape(shape)
+		else:
+			a = np.memmap(fileName, dtype = dtype, mode = 'r', offset = offset, shape = shape)
+		if sampwidth == 3 and decode:
+			return AudioIO._pcm24ToInt32(a)
+
+		return a
+
+	@staticmethod
+	def _pcm24ToInt32(a):
+		""" Sign extend 24-bit little endian samples, given as ... x 3 bytes, to int32 """
+		b = np.zeros(a.shape[:-1] + (4,), dtype = np.uint8)
+		b[..., 1:] = a
+		# The bytes are the sample * 256 as little endian int32, the shift keeps the sign
+		result = b.view('<i4')[..., 0]
+		result >>= 8
+
+		return result
+
+	@staticmethod
+	def _pcm2float(samples, header, out=None, dtype=np.float64, scratch=None):
+		""" PCM decoder: scale unscaled samples from _mapWAVFrames to floating point between [-1,1],
+			into the array out if it is given, otherwise into a new array of type dtype.
+			The samples are decoded in chunks of pcmChunkFrames frames straight into out, such that
+			no temporary array of the size of the signal is allocated. 24-bit samples may be given
+			as numFrames x numChannels x 3 bytes (_mapWAVFrames with decode = False), they are
+			assembled in a small scratch buffer as int32 samples * 256. A preallocated scratch
+			buffer of at least min(pcmChunkFrames, numFrames) x numChannels x 4 zeroed bytes can be
+			given for repeated calls, e.g. by wavBlocks.
+		"""
+		if out is None:
+			out = np.empty(samples.shape[:2], dtype = dtype)
+		sWidth = header['sampwidth']
+		if header['formatTag'] == 3:
+			out[...] = samples
+			return out
+
+		norm = AudioIO.normFact['int' + str(8 * sWidth)]
+		if sWidth == 3 and samples.ndim == 3:
+			if scratch is None:
+				scratch = np.zeros((min(AudioIO.pcmChunkFrames, len(samples)),) + samples.shape[1:2] + (4,), dtype = np.uint8)
+			norm = norm * 256
+		for pin in range(0, len(samples), AudioIO.pcmChunkFrames):
+			pend = min(pin + AudioIO.pcmChunkFrames, len(samples))
+			chunk = samples[pin:pend]
+			if chunk.ndim == 3:
+				scratch[:pend - pin, :, 1:] = chunk
+				chunk = scratch[:pend - pin].view('<i4')[..., 0]
+			np.divide(chunk, norm, out = out[pin:pend])
+			if sWidth == 1:
+				out[pin:pend] -= 1.0
+
+		return out
+
+	@staticmethod
+	def _float2pcm(y, sampwidth, out):
+		""" PCM encoder: scale floating point samples between [-1,1] to integer PCM samples with
+			sampwidth bytes, rounded and clipped to their range, into the uint8 array out of
+			len(y) x numChannels x sampwidth bytes in the little endian byte order of WAV files.
+		"""
+		norm = AudioIO.normFact['int' + str(8 * sampwidth)]
+		scaled = np.multiply(y, norm, dtype = np.float64)
+		if sampwidth == 1:
+			# 8 bit samples are stored as unsigned ints
+			scaled += norm
+			np.clip(scaled, 0, 255, out = scaled)
+		else:
+			np.clip(scaled, -norm - 1, norm, out = scaled)
+		np.rint(scaled, out = scaled)
+		if sampwidth == 3:
+			pcm = scaled.astype('<i4')
+			out[...] = pcm.view(np.uint8).reshape(pcm.shape + (4,))[..., :3]
+		else:
+			pcm = out.view('<%s%d' % ('u' if sampwidth == 1 else 'i', sampwidth)).reshape(scaled.shape)
+			pcm[...] = scaled
+
+		return out
+
+	@staticmethod
+	def _loadWAVWithScipy(fileName):
+		""" Load samples & sample rate from WAV file """
+		# scipy is only imported for the formats which need it, it slows down the import
+		from scipy.io.wavfile import read
+		inputData = read(fileName)
+		samples = inputData[1]
+		sampleRate = inputData[0]
+
+		return samples, sampleRate
+
+	# Sub format GUID of PCM in WAVE_FORMAT_EXTENSIBLE files, 00000001-0000-0010-8000-00aa00389b71
+	_pcmSubFormat = struct.pack('<IHH', 1, 0, 0x10) + bytes((0x80, 0, 0, 0xAA, 0, 0x38, 0x9B, 0x71))
+
+	@staticmethod
+	def wavWrite(y, fs, nbits, audioFile):
+		""" Write samples to WAV file as integer PCM. The samples are encoded in chunks of
+			pcmChunkFrames frames, such that no copy of the whole signal is allocated.
+			Files with more than 16 bits or 2 channels are written as WAVE_FORMAT_EXTENSIBLE.
+        Args:
+            samples: (ndarray / 2D ndarray) (floating point) sample vector between [-1,1],
+                        values outside are clipped
+                    	mono: DIM: nSamples
+                    	stereo: DIM: nSamples x nChannels
+
+            fs: 	(int) Sample rate in Hz
+            nBits: 	(int) Number of bits, 8, 16, 24 or 32
+            fnWAV: 	(string) WAV file name to write
+		"""
+		if nbits not in (8, 16, 24, 32):
+			raise ValueError('nbits must be 8, 16, 24 or 32.')
+		y = np.asarray(y)
+		if y.ndim == 1:
+			y = y[:, None]
+		nframes, nchannels = y.shape
+		sampwidth = nbits // 8
+		blockAlign = nchannels * sampwidth
+		dataSize = nframes * blockAlign
+		with open(audioFile, 'wb') as f:
+			fmt = struct.pack('<HHIIHH', 1, nchannels, int(fs), int(fs) * blockAlign, blockAlign, nbits)
+			# WAVE_FORMAT_EXTENSIBLE for more than 16 bits or 2 channels, with the valid bits, the
+			# speakers of the channels in the standard order and the PCM sub format GUID
+			if nbits > 16 or nchannels > 2:
+				channelMask = (1 << nchannels) - 1 if nchannels <= 18 else 0
+				fmt = (struct.pack('<H', 0xFFFE) + fmt[2:] + struct.pack('<HHI', 22, nbits, channelMask)
+					   + AudioIO._pcmSubFormat)
+			f.write(b'RIFF' + struct.pack('<I', 20 + len(fmt) + dataSize + dataSize % 2) + b'WAVE')
+			f.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+			f.write(b'data' + struct.pack('<I', dataSize))
+			buf = np.empty((min(AudioIO.pcmChunkFrames, nframes), nchannels, sampwidth), dtype = np.uint8)
+			for pin in range(0, nframes, AudioIO.pcmChunkFrames):
+				pend = min(pin + AudioIO.pcmChunkFrames, nframes)
+				f.write(AudioIO._float2pcm(y[pin:pend], sampwidth, buf[:pend - pin]))
+			# Chunks have an even size
+			if dataSize % 2:
+				f.write(b'\0')
+
+	@staticmethod
+	def sound(x,fs):
+		""" Plays a wave file using the pyglet library. But first, it has to be written.
+			Termination of the playback is being performed by any keyboard input and Enter.
+			Args:
+			x: 		   (array) Floating point samples
+			fs:		   (int) The sampling rate
+		"""
+		import pyglet as pg
+		global player
+		# Call the writing function
+		AudioIO.wavWrite(x, fs, 16, 'testPlayback.wav')
+		# Initialize playback engine
+		player = pg.media.Player()
+		# Initialize the object with the audio file
+		playback = pg.media.load('testPlayback.wav')
+		# Set it to player
+		player.queue(playback)
+		# Sound call
+		player.play()
+		# Killed by "keyboard"
+		kill = raw_input()
+		if kill or kill == '':
+			AudioIO.stop()
+		# Remove the dummy wave write
+		os.remove('testPlayback.wav')
+
+	@staticmethod
+	def stop():
+		""" Stops a playback object of the pyglet library.
+			It does not accept arguments, but a player has to be
+			already initialized by the above "sound" method.
+		"""
+		global player
+		# Just Pause & Destruct
+		player.pause()
+		player = None
+		return None
+
+	@staticmethod
+	def energyNormalisation(x1, x2, wsz = 1024, inPlace = False):
+		""" Function to perform energy normalisation of two audio signals,
+		based on envelopes acquired by Hilbert transformation. All windows
+		are processed at once, with one batched FFT for the envelopes.
+
+        Args:
+            x1	:   (np array)      First audio signal
+            x2	:   (np array)      Second audio signal
+            wsz :	(int)			Number of samples to take into account for the
+             						computation of the analytic function. If set
+             						to zero the whole signal will be analysed
+             						at once.
+            inPlace :	(bool)		Switch if x1 and x2 should be overwritten with
+             						the results (they must be float arrays of equal length).
+        Returns:
+			y1	:	(np array)	    Energy normalised output signal
+			y2	:	(np array)	    Energy normalised output signal
+			(both of length max(len(x1), len(x2)), the shorter one padded with zeros)
+        """
+		x1 = np.reshape(x1, -1)
+		x2 = np.reshape(x2, -1)
+		numSamples = max(len(x1), len(x2))
+		if inPlace:
+			if len(x1) != len(x2):
+				raise ValueError('In place normalisation needs signals of equal length.')
+			y1 = x1
+			y2 = x2
+		else:
+			y1 = np.zeros(numSamples)
+			y2 = np.zeros(numSamples)
+			y1[:len(x1)] = x1
+			y2[:len(x2)] = x2
+
+		if wsz == 0:
+			xa1 = AudioIO.hilbertEnvelope(y1)
+			xa2 = AudioIO.hilbertEnvelope(y2)
+
+			energy1 = np.mean(xa1 ** 2.0)
+			energy2 = np.mean(xa2 ** 2.0)
+
+			if energy1 > energy2:
+				y2 *= energy1/energy2
+			else :
+				y1 *= energy2/energy1
+
+		else:
+			# Zero padded copies with complete windows, for the envelopes only
+			numWindows = -(-numSamples // wsz)
+			xp = np.zeros((2, numWindows * wsz))
+			xp[0, :numSamples] = y1
+			xp[1, :numSamples] = y2
+
+			# Mean envelope of each window, windows are strided views of the padded signals
+			energy = np.mean(AudioIO.hilbertEnvelope(xp.reshape(2 * numWindows, wsz)), axis = 1)
+			energy1 = energy[:numWindows]
+			energy2 = energy[numWindows:]
+
+			valid = (energy1 > 1e-4) & (energy2 > 1e-4)
+			with np.errstate(divide = 'ignore', invalid = 'ignore'):
+				gain1 = np.where(valid & (energy1 < energy2), energy2 / energy1, 1.0)
+				gain2 = np.where(valid & (energy1 > energy2), energy1 / energy2, 1.0)
+
+			AudioIO._applyWindowGains(y1, gain1, wsz)
+			AudioIO._applyWindowGains(y2, gain2, wsz)
+
+		AudioIO.twoSideClip(y1, -1.0, 1.0)
+		AudioIO.twoSideClip(y2, -1.0, 1.0)
+
+		y1.shape = (len(y1),1)
+		y2.shape = (len(y2),1)
+		return y1, y2
+
+	@staticmethod
+	def hilbertEnvelope(x):
+		""" Envelope of signals, the magnitude of their analytic signals
+			computed by Hilbert transformation with FFTs.
+        Args:
+            x		:       (np array)      Signal, or 2D array with a signal in each row
+        Returns:
+			env		:		(np array)	    Envelope of the same shape as x
+        """
+		n = x.shape[-1]
+		# Hilbert transform with real FFTs: phase shift by -90 degrees, except DC and Nyquist
+		X = np.fft.rfft(x, axis = -1)
+		X *= -1j
+		X[..., 0] = 0.0
+		if n % 2 == 0:
+			X[..., -1] = 0.0
+		xh = np.fft.irfft(X, n, axis = -1)
+
+		# Magnitude of the analytic signal x + j*xh (faster than np.hypot)
+		xh *= xh
+		xh += x * x
+
+		return np.sqrt(xh, out = xh)
+
+	@staticmethod
+	def _applyWindowGains(x, gains, wsz):
+		""" Multiply the windows of wsz samples of x in place with their gains """
+		numFull = len(x) // wsz
+		windows = x[:numFull * wsz].view()
+		# Raises an error instead of silently copying if x is not contiguous
+		windows.shape = (numFull, wsz)
+		windows *= gains[:numFull, None]
+		x[numFull * wsz:] *= gains[numFull:numFull + 1]
+
+	@staticmethod
+	def twoSideClip(x, minimum, maximum, inPlace = True):
+		""" Method to limit an input array inside a given
+			range.
+        Args:
+            x		:       (np array)      Input array to be limited
+            minimum	:       (int)      		Minimum value to be considered for cliping.
+            maximum :		(int)			Maximum value to be considered for cliping.
+            inPlace :		(bool)			Switch if x should be overwritten with the result.
+
+        Returns:
+			x		:		(np array)	    Limited output array
+        """
+		if inPlace:
+			return np.clip(x, minimum, maximum, out = x)
+
+		return np.clip(x, minimum, maximum)
+
+if __name__ == "__main__":
+	import sys, tempfile
+	# A fake ffmpeg for testing the pipes offline: the "compressed" input files are 16-bit WAV files,
+	# they are decoded to a 32-bit float WAV on stdout, and float samples from stdin are written as 16-bit WAV.
+	fakeffmpeg = """
+import sys, struct, wave, numpy as np
+args = sys.argv[1:]
+source = args[args.index('-i') + 1]
+if source != 'pipe:0':
+	assert args[args.index('-f') + 1] == 'wav' and args[args.index('-acodec') + 1] == 'pcm_f32le' and args[-1] == 'pipe:1'
+	try:
+		wav = wave.open(source)
+	except OSError as e:
+		sys.stderr.write(str(e))
+		sys.exit(1)
+	nchannels, fs = wav.getnchannels(), wav.getframerate()
+	data = (np.frombuffer(wav.readframes(wav.getnframes()), dtype = '<i2') / 32767.0).astype('<f4').tobytes()
+	out = sys.stdout.buffer
+	# Streamed WAV files carry an unknown data size
+	out.write(b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVEfmt ' + struct.pack('<IHHIIHH', 16, 3, nchannels, fs, fs * nchannels * 4, nchannels * 4, 32))
+	out.write(b'data' + struct.pack('<I', 0xFFFFFFFF) + data)
+else:
+	assert args[args.index('-f') + 1] == 'f32le'
+	nchannels, fs = int(args[args.index('-ac') + 1]), int(args[args.index('-ar') + 1])
+	y = np.frombuffer(sys.stdin.buffer.read(), dtype = '<f4')
+	wav = wave.open(args[-1], 'wb')
+	wav.setnchannels(nchannels)
+	wav.setsampwidth(2)
+	wav.setframerate(fs)
+	wav.writeframes(np.rint(np.clip(y, -1, 1) * 32767).astype('<i2').tobytes())
+	wav.close()
+"""
+	# Pipes to and from ffmpeg, with the fake ffmpeg:
+	tmpDir = tempfile.mkdtemp()
+	AudioIO.ffmpegBinary = os.path.join(tmpDir, 'ffmpeg')
+	with open(AudioIO.ffmpegBinary, 'w') as f:
+		f.write('#!' + sys.executable + '\n' + fakeffmpeg)
+	os.chmod(AudioIO.ffmpegBinary, 0o755)
+	x = np.round(np.random.uniform(-0.5, 0.5, (44100, 2)) * 32767) / 32767
+	AudioIO.wavWrite(x, 44100, 16, os.path.join(tmpDir, 'test.mp3'))
+	y, fs = AudioIO.audioRead(os.path.join(tmpDir, 'test.mp3'))
+	print("audioRead:", y.shape, fs, "error:", np.max(np.abs(y - x)))
+	y, fs = AudioIO.audioRead(os.path.join(tmpDir, 'test.mp3'), mono = True, startSec = 0.25, endSec = 0.5)
+	print("Segment, mono:", y.shape, "error:", np.max(np.abs(y - 0.5 * (x[11025:22050, 0] + x[11025:22050, 1]))))
+	AudioIO.audioWrite(x, 44100, 16, os.path.join(tmpDir, 'written.mp3'), 'mp3')
+	y, fs = AudioIO.audioRead(os.path.join(tmpDir, 'written.mp3'))
+	print("audioWrite:", y.shape, fs, "error:", np.max(np.abs(y - x)))
+	try:
+		AudioIO.audioRead(os.path.join(tmpDir, 'missing.mp3'))
+	except Exception as e:
+		print("Missing file:", str(e).split(':')[0])
+	AudioIO.ffmpegBinary = None
+	# 24 bit and multichannel files are written as WAVE_FORMAT_EXTENSIBLE:
+	for nbits, nchannels in ((16, 2), (24, 2), (16, 6), (32, 1)):
+		x = np.round(np.random.uniform(-0.5, 0.5, (1000, nchannels)) * 32767) / 32767
+		fileName = os.path.join(tmpDir, 'test%d_%d.wav' % (nbits, nchannels))
+		AudioIO.wavWrite(x, 48000, nbits, fileName)
+		with open(fileName, 'rb') as f:
+			data = f.read()
+		formatTag = struct.unpack('<H', data[20:22])[0]
+		y, fs = AudioIO.wavRead(fileName)
+		print("%d bit, %d channels: format tag 0x%04X, error:" % (nbits, nchannels, formatTag),
+			  np.max(np.abs(y.reshape(x.shape) - x)))
+		if (formatTag == 0xFFFE) != (nbits > 16 or nchannels > 2) or struct.unpack('<I', data[4:8])[0] != len(data) - 8:
+			raise AssertionError('wrong WAV header')
+		if formatTag == 0xFFFE:
+			from scipy.io import wavfile
+			z = wavfile.read(fileName)[1].reshape(y.shape)
+			if np.max(np.abs(z / 2.0**(8 * z.itemsize - 1) - y)) > 2.0**(1 - nbits):
+				raise AssertionError('scipy reads other samples')
+
+	# Define File
+	myReadFile = 'EnterYourWavFile.wav'
+	if not os.path.exists(myReadFile):
+		sys.exit()
+	# Read the file
+	x, fs = AudioIO.wavRead(myReadFile, mono = True)
+	# Gain parameter
+	g = 0.5
+	# Listen to it
+	AudioIO.sound(x*g,fs)
+	# Make it better and write it to disk
+	x2 = np.empty((len(x),2), dtype = np.float32)
+	try :
+		x2[:,0] = x * g
+		x2[:,1] = np.roll(x*g, 512)
+	except ValueError:
+		x2[:,0] = x[:,0] * g
+		x2[:,1] = np.roll(x[:,0] * g, 256)
+	# Listen to stereo processed
+	AudioIO.sound(x2*g,fs)
+	AudioIO.audioWrite(x2, fs, 16, 'myNewWavFile.wav', 'wav')
+
@@ -0,0 +1,273 @@
+#Functions to implement the complete Low Delay filter bank (LDFB), parallel to MDCTfb.py.
+#File based, it computes all blocks of the audio signal at once, and a streaming mode for signals
+#of arbitrary length.
+#Algorithm according to:
+#G. Schuller and T. Karp: "Modulated Filter Banks with Arbitrary System Delay: Efficient Implementations and
+#the Time-Varying Case", IEEE Transactions on Signal Processing, March 2000, pp. 737-748
+#The analysis filter bank is F D(z) G_0(z) G_1(z) ... H_2(z) DCT4, as LDFB in the notebook
+#AC_03_FilterBanks2, but each stage processes all blocks of the signal in one vectorized operation,
+#with the blocks in the rows of an array of shape (...,# of blocks,N). Every stage has one block
+#of memory, which is kept between the chunks in the streaming mode.
+#The subbands are scaled with the orthonormal DCT4 as in MDCTfb, not as in the notebook.
+
+import numpy as np
+from functools import lru_cache
+from .MDCTfb import DCT4fft, DCT4twiddles
+
+#The coefficient file of the low delay filter bank with 512 subbands, filter length 2048 and
+#system delay 1023, which comes with the notebooks, package data of audiocoding:
+LDFBcoeffFile='fb2048t1023d512bbitcs.mat'
+
+@lru_cache(maxsize=8)
+def loadLDFBcoeffs(fileName=None):
+   #Loads the coefficients of a low delay filter bank from the text file fileName, only once.
+   #If fileName is None, from LDFBcoeffFile in the package, also if it is installed as zip file.
+   #The file contains 2N coefficients for the F matrix and N/2 for each G matrix. We assume a
+   #symmetric F matrix (det=1), hence we only need the first 1.5N coefficients of F, not 2N.
+   #returns N and fb, the read-only coefficients for LDFBanafb, with 1.5N coefficients for the
+   #F matrix followed by N/2 coefficients for each G matrix.
+   if fileName is None:
+      from importlib import resources
+      with resources.files(__package__).joinpath(LDFBcoeffFile).open('r') as f:
+         fb=np.loadtxt(f)
+   else:
+      fb=np.loadtxt(fileName)
+   #the files have 2N coefficients for F and 2 G matrices:
+   N=len(fb)//3
+   fb=np.append(fb[:int(1.5*N)],fb[2*N:])
+   fb.setflags(write=False)
+   return N,fb
+
+def LDFBcoeffs(N,fb):
+   #Splits the coefficients fb for N subbands into the F matrix coefficients fcoeff,
+   #the lower right diagonal ff of the F matrix from the symmetry (det=1),
+   #and the list of the coefficients of the G matrices, N/2 each.
+   h=N//2
+   fcoeff=np.asarray(fb[:int(1.5*N)],dtype=float)
+   #+-1=det([a,b;c,d]) =a*d-b*c => d=(+-1+b*c)/a:
+   ff=(-1.0+fcoeff[N:int(1.5*N)][::-1]*fcoeff[h:N])/fcoeff[:h][::-1]
+   gcoeffs=[np.asarray(fb[k:k+h],dtype=float) for k in range(int(1.5*N),len(fb)-h+1,h)]
+   return fcoeff,ff,gcoeffs
+
+#The stages, for the blocks X in the rows of an array of shape (...,L,N), and the memory z,
+#the last input block of the previous call, of shape (...,N):
+
+def delayed(X,z):
+   #returns the blocks X delayed by one block, with z as the first block
+   return np.concatenate((z[...,None,:],X[...,:-1,:]),axis=-2)
+
+def Fstage(X,fcoeff,ff):
+   #the symmetric F matrix, as symFmatrix in the notebook
+   N=X.shape[-1]
+   h=N//2
+   out=np.empty(X.shape)
+   out[...,:h]=(fcoeff[:h]*X[...,:h])[...,::-1]+fcoeff[h:N]*X[...,h:]
+   out[...,h:]=fcoeff[N:(N+h)]*X[...,:h]+(ff*X[...,h:])[...,::-1]
+   return out
+
+def Finvstage(X,fcoeff,ff):
+   #the inverse of the symmetric F matrix, as symFinvmatrix in the notebook
+   N=X.shape[-1]
+   h=N//2
+   out=np.empty(X.shape)
+   out[...,:h]=-ff[::-1]*X[...,:h][...,::-1]+fcoeff[h:N][::-1]*X[...,h:]
+   out[...,h:]=fcoeff[N:int(1.5*N)][::-1]*X[...,:h]-fcoeff[:h][::-1]*X[...,h:][...,::-1]
+   return out
+
+def Dstage(X,z):
+   #the delay matrix D(z), delays the first half of each block
+   h=X.shape[-1]//2
+   out=X.copy()
+   out[...,:h]=delayed(X[...,:h],z[...,:h])
+   return out
+
+def Dinvstage(X,z):
+   #the inverse delay matrix, delays the second half of each block
+   h=X.shape[-1]//2
+   out=X.copy()
+   out[...,h:]=delayed(X[...,h:],z[...,h:])
+   return out
+
+def Gstage(X,z,ecoeff):
+   #the matrix G_i(z): anti-diagonal ones, and delays with coefficients in the upper half of the diagonal
+   h=X.shape[-1]//2
+   out=X[...,::-1].copy()
+   out[...,:h]+=delayed(X[...,:h],z[...,:h])*ecoeff
+   return out
+
+def Ginvstage(X,z,ecoeff):
+   #the inverse of G_i(z): delays with flipped negative coefficients in the lower half of the diagonal
+   h=X.shape[-1]//2
+   out=X[...,::-1].copy()
+   out[...,h:]-=delayed(X[...,h:],z[...,h:])*ecoeff[::-1]
+   return out
+
+def H2stage(X,z,h2coeff):
+   #the matrix H_2(z): anti-diagonal delays, and coefficients in the upper half of the diagonal
+   h=X.shape[-1]//2
+   out=delayed(X,z)[...,::-1].copy()
+   out[...,:h]+=X[...,:h]*h2coeff
+   return out
+
+def H2invstage(X,z,h2coeff):
+   #the inverse of H_2(z): anti-diagonal delays, and flipped negative coefficients in the lower half
+   h=X.shape[-1]//2
+   out=delayed(X,z)[...,::-1].copy()
+   out[...,h:]-=X[...,h:]*h2coeff[::-1]
+   return out
+
+#The complete filter bank, from the stages:
+
+def LDFBanastages(X,N,fb,h2coeff,z):
+   #Applies the analysis stages to the blocks X of shape (...,L,N), with the memory z, a list with
+   #the last input block of each stage with a delay, which is updated. returns the subbands (...,L,N).
+   fcoeff,ff,gcoeffs=LDFBcoeffs(N,fb)
+   X=Fstage(X,fcoeff,ff)
+   stages=[(Dstage,())]+[(Gstage,(g,)) for g in gcoeffs]
+   if h2coeff is not None:
+      stages.append((H2stage,(h2coeff,)))
+   for k,(stage,args) in enumerate(stages):
+      Y=stage(X,z[k],*args)
+      z[k]=X[...,-1,:]
+      X=Y
+   return DCT4fft(X,DCT4twiddles(N))
+
+def LDFBsynstages(Y,N,fb,h2coeff,z):
+   #Applies the synthesis stages to the subbands Y of shape (...,L,N) in the rows,
+   #with the memory z as in LDFBanastages. returns the reconstructed blocks (...,L,N).
+   fcoeff,ff,gcoeffs=LDFBcoeffs(N,fb)
+   X=DCT4fft(Y,DCT4twiddles(N))
+   stages=[]
+   if h2coeff is not None:
+      stages.append((H2invstage,(h2coeff,)))
+   stages+=[(Ginvstage,(g,)) for g in gcoeffs[::-1]]+[(Dinvstage,())]
+   for k,(stage,args) in enumerate(stages):
+      Y=stage(X,z[k],*args)
+      z[k]=X[...,-1,:]
+      X=Y
+   return Finvstage(X,fcoeff,ff)
+
+def LDFBdegree(N,fb,h2coeff=None):
+   #returns the number of stages with delays, the number of blocks the output is longer than the input
+   return 1+len(LDFBcoeffs(N,fb)[2])+(h2coeff is not None)
+
+def LDFBdelay(N,h2coeff=None):
+   #returns the delay in samples of the reconstructed signal, N, plus 2N for H_2(z) and its
+   #inverse, which both delay the whole block
+   return N*(1+2*(h2coeff is not None))
+
+def LDFBanafb(x,N,fb,h2coeff=None):
+   #LDFB analysis filter bank.
+   #Arguments: x: input signal, e.g. audio signal, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels)
+   #N: number of subbands
+   #fb: coefficients for the LDFB, 1.5*N coefficients for the F matrix and N/2 for each G matrix,
+   #e.g. from loadLDFBcoeffs
+   #h2coeff: N/2 coefficients for an H_2(z) matrix, None for filter banks without it
+   #returns y, consisting of blocks of subbands in a 2-d array of shape (N,# of blocks),
+   #for multichannel signals a 3-d array of shape (# of channels, N, # of blocks).
+   #It contains all blocks with output, LDFBdegree blocks more than the input.
+   x=np.asarray(x)
+   L=x.shape[0]//N
+   deg=LDFBdegree(N,fb,h2coeff)
+   if x.ndim==1:
+      X=np.reshape(x[:L*N],(L,N))
+   else:
+      X=np.transpose(np.reshape(x[:L*N],(L,N,-1)),(2,0,1))
+   #zero blocks at the end to flush the memory of the stages:
+   X=np.concatenate((X,np.zeros(X.shape[:-2]+(deg,N))),axis=-2)
+   z=[np.zeros(X.shape[:-2]+(N,))]*deg
+   y=LDFBanastages(X,N,fb,h2coeff,z)
+   return np.swapaxes(y,-1,-2)
+
+def LDFBsynfb(y,fb,h2coeff=None):
+   #LDFB synthesis filter bank.
+   #Arguments: y: 2-d array of blocks of subbands, of shape (N, # of blocks),
+   #or a 3-d array of shape (# of channels, N, # of blocks) for multichannel signals
+   #fb, h2coeff: coefficients as for LDFBanafb
+   #returns xr, the reconstructed signal, a 1-d array,
+   #for multichannel signals of shape (# of samples, # of channels).
+   #The signal of LDFBanafb is reconstructed with a delay of LDFBdelay(N,h2coeff) samples,
+   #N samples, or 3N with an H_2(z) matrix.
+   N=y.shape[-2]
+   deg=LDFBdegree(N,fb,h2coeff)
+   Y=np.swapaxes(y,-1,-2)
+   Y=np.concatenate((Y,np.zeros(Y.shape[:-2]+(deg,N))),axis=-2)
+   z=[np.zeros(Y.shape[:-2]+(N,))]*deg
+   xr=LDFBsynstages(Y,N,fb,h2coeff,z)
+   if y.ndim==3:
+      return np.reshape(xr,(y.shape[0],-1)).T
+   return np.reshape(xr,-1)
+
+def LDFBanastream(chunks,N,fb,h2coeff=None):
+   #Streaming LDFB analysis filter bank, for arbitrarily long signals.
+   #Keeps the memory of the stages and the samples of an incomplete block between the chunks,
+   #the result is identical to LDFBanafb applied to the concatenated signal.
+   #Arguments: chunks: iterable (e.g. a generator) of 1-dim. arrays of arbitrary length
+   #N, fb, h2coeff: as for LDFBanafb
+   #yields y, the new blocks of subbands in 2-d arrays of shape (N,# of blocks),
+   #the last one are the blocks which are still in the memory at the end of the signal.
+   deg=LDFBdegree(N,fb,h2coeff)
+   z=[np.zeros(N)]*deg
+   rest=np.zeros(0)
+   for chunk in chunks:
+      x=np.append(rest,chunk)
+      L=len(x)//N
+      rest=x[L*N:]
+      if L==0:
+         continue
+      yield LDFBanastages(np.reshape(x[:L*N],(L,N)),N,fb,h2coeff,z).T
+   #flush the memory:
+   yield LDFBanastages(np.zeros((deg,N)),N,fb,h2coeff,z).T
+
+def LDFBsynstream(blocks,fb,h2coeff=None):
+   #Streaming LDFB synthesis filter bank, the counterpart of LDFBanastream.
+   #The concatenated output is identical to LDFBsynfb applied to all blocks at once.
+   #Arguments: blocks: iterable of 2-d arrays of blocks of subbands, each of shape (N, # of blocks)
+   #fb, h2coeff: as for LDFBanafb
+   #yields xr, the reconstructed signal for each chunk of blocks, 1-d arrays,
+   #the last one are the blocks which are still in the memory at the end.
+   z=None
+   for y in blocks:
+      N,L=y.shape
+      if L==0:
+         continue
+      if z is None:
+         deg=LDFBdegree(N,fb,h2coeff)
+         z=[np.zeros(N)]*deg
+      yield np.reshape(LDFBsynstages(y.T,N,fb,h2coeff,z),-1)
+   if z is not None:
+      yield np.reshape(LDFBsynstages(np.zeros((deg,N)),N,fb,h2coeff,z),-1)
+
+
+#Testing:
+if __name__ == '__main__':
+   import time
+   N,fb=loadLDFBcoeffs()
+   print("N=", N, "number of G matrices:", len(LDFBcoeffs(N,fb)[2]))
+   x=np.random.randn(200*N)
+   t=time.time()
+   y=LDFBanafb(x,N,fb)
+   xr=LDFBsynfb(y,fb)
+   print("Analysis and synthesis of %d blocks: %g s" % (200, time.time()-t))
+   #Perfect reconstruction with a delay of N samples:
+   d=LDFBdelay(N)
+   print("Reconstruction error:", np.max(np.abs(xr[d:d+len(x)]-x)))
+   #Streaming in chunks of arbitrary length gives identical results:
+   chunks=(x[i:i+1000] for i in range(0,len(x),1000))
+   ys=np.hstack(list(LDFBanastream(chunks,N,fb)))
+   print("Streaming analysis identical:", np.array_equal(ys,y))
+   yblocks=(y[:,i:i+7] for i in range(0,y.shape[1],7))
+   xs=np.hstack(list(LDFBsynstream(yblocks,fb)))
+   print("Streaming synthesis identical:", np.array_equal(xs,xr))
+   #Multichannel signals, all channels at once:
+   x2=np.stack((x,-x),axis=1)
+   y2=LDFBanafb(x2,N,fb)
+   print("Multichannel analysis error:", np.max(np.abs(y2[0]-y)), np.max(np.abs(y2[1]+y)))
+   print("Multichannel synthesis error:", np.max(np.abs(LDFBsynfb(y2,fb)[:,0]-xr)))
+   #With an H_2(z) matrix:
+   h2coeff=np.random.rand(N//2)
+   xr=LDFBsynfb(LDFBanafb(x,N,fb,h2coeff),fb,h2coeff)
+   #the delay is 3N samples:
+   d=LDFBdelay(N,h2coeff)
+   print("Reconstruction error with H2:", d, np.max(np.abs(xr[d:d+len(x)]-x)))
@@ -0,0 +1,516 @@
+#Functions to implement the complete MDCT filter bank. File based, it first reads in the complete audio file and then computes the MDCT filter bank output.
+#Gerald Schuller, August 2017.
+
+
+import numpy as np
+from .primitives import DCT4, symFmatrix, Dmatrix, Dinvmatrix, polmatmult, x2polyphase, polyphase2x
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from .profiling import profiled
+
+#Multichannel signals, the channels are kept in the first dimension of the polyphase arrays,
+#such that polmatmult processes all channels of a block in one matrix multiplication:
+
+def multichannel2polyphase(x,N):
+   #Converts a multichannel signal x of shape (# of samples, # of channels) into a
+   #polyphase array of shape (# of channels, N, # of blocks), like x2polyphase for each channel.
+   L=x.shape[0]//N
+   return np.transpose(np.reshape(x[:(L*N)],(L,N,-1)),(2,1,0))
+
+def polyphase2multichannel(xp):
+   #Converts a polyphase array of shape (# of channels, N, # of blocks) back to a
+   #multichannel signal of shape (# of samples, # of channels), like polyphase2x for each channel.
+   return np.reshape(np.transpose(xp,(2,1,0)),(-1,xp.shape[0]))
+
+def DCT4channels(y):
+   #DCT4 of a polyphase array of shape (# of channels, N, # of blocks) with one call of DCT4,
+   #by placing the blocks of all channels next to each other.
+   C,N,L=y.shape
+   if C==1:
+      return DCT4(y)
+   y=np.reshape(np.transpose(y,(1,0,2)),(1,N,C*L))
+   y=DCT4(y)
+   return np.transpose(np.reshape(y,(N,C,L)),(1,0,2))
+
+def MDCTanafb(x,N,fb,backend='polmat',dtype=np.float64,workers=1):
+   #MDCT analysis filter bank.
+   #Arguments: x: input signal, e.g. audio signal, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels), as from AudioIO.wavRead
+   #N: number of subbands
+   #fb: coefficients for the MDCT filter bank, for the F matrix, np.array with 1.5*N coefficients.
+   #backend: 'polmat' for this reference implementation with polynomial matrices,
+   #'fft' for the fast implementation MDCTanafbfft
+   #dtype: np.float64 or np.float32 for the computation and the subbands, see MDCTanafbfft for the
+   #error bounds.
+   #workers: number of threads, see MDCTanafbparallel, None for the number of CPUs
+   #returns y, consisting of blocks of subband in in a 2-d array of shape (N,# of blocks),
+   #for multichannel signals a 3-d array of shape (# of channels, N, # of blocks)
+   
+   if workers!=1:
+      return MDCTanafbparallel(x,N,fb,backend,dtype,workers)
+   if backend=='fft':
+      return profiled('MDCTanafbfft',MDCTanafbfft,x,N,fb,dtype)
+   elif backend!='polmat':
+      raise ValueError("Unknown backend '%s', use 'polmat' or 'fft'." % backend)
+   plan=getMDCTplan(N,fb)
+   Fa,D=plan.matrices(dtype)[:2]
+   x=np.asarray(x,dtype=dtype)
+   #the stages are recorded if a profiling.Profiler is active:
+   if x.ndim==1:
+      y=profiled('x2polyphase',x2polyphase,x,N,dtype)
+   else:
+      y=profiled('x2polyphase',multichannel2polyphase,x,N)
+   y=profiled('polmatmult Fa',polmatmult,y,Fa)
+   y=profiled('polmatmult D',polmatmult,y,D)
+   y=profiled('DCT4',DCT4channels,y)
+   if x.ndim==1:
+      #strip first dimension:
+      y=y[0,:,:]
+   return y.astype(dtype,copy=False)
+
+def MDCTanastream(chunks,N,fb):
+   #Streaming MDCT analysis filter bank, for arbitrarily long signals.
+   #Keeps the delay line state of D(z) and the samples of an incomplete block between
+   #the chunks, hence memory stays constant and the result is bit-identical to MDCTanafb
+   #applied to the concatenated signal.
+   #Arguments: chunks: iterable (e.g. a generator) of 1-dim. arrays of arbitrary length
+   #N: number of subbands
+   #fb: coefficients for the MDCT filter bank, for the F matrix, np.array with 1.5*N coefficients.
+   #yields y, the new blocks of subbands in 2-d arrays of shape (N,# of blocks),
+   #the last one is the block which is still in the delay line at the end of the signal.
+   
+   plan=getMDCTplan(N,fb)
+   Fa=plan.Fa
+   D=plan.D
+   #samples of an incomplete block, to be completed by the next chunk:
+   rest=np.zeros(0)
+   #memory of D(z), the last block after the F matrix (None before the first block):
+   z=None
+   for chunk in chunks:
+      x=np.append(rest,chunk)
+      L=len(x)//N
+      rest=x[L*N:]
+      if L==0:
+         continue
+      y=x2polyphase(x[:L*N],N)
+      y=polmatmult(y,Fa)
+      if z is None:
+         yd=polmatmult(y,D)[:,:,:L]
+      else:
+         #prepend the memory, its output block was already computed before:
+         yd=polmatmult(np.concatenate((z,y),axis=2),D)[:,:,1:(L+1)]
+      z=y[:,:,-1:]
+      yd=DCT4(yd)
+      yield yd[0,:,:]
+   #flush the delay line, the last block of MDCTanafb:
+   if z is not None:
+      yd=polmatmult(z,D)[:,:,1:]
+      yd=DCT4(yd)
+      yield yd[0,:,:]
+   
+def MDCTsynfb(y,fb,backend='polmat',dtype=np.float64,workers=1):
+   #MDCT synthesis filter bank.
+   #Arguments: y: 2-d array of blocks of subbands, of shape (N, # of blokcs),
+   #or a 3-d array of shape (# of channels, N, # of blocks) for multichannel signals
+   #backend: 'polmat' for this reference implementation, 'fft' for MDCTsynfbfft
+   #dtype: np.float64 or np.float32 for the computation and the reconstructed signal, like in MDCTanafb
+   #workers: number of threads, see MDCTsynfbparallel, None for the number of CPUs
+   #returns xr, the reconstructed signal, a 1-d array,
+   #for multichannel signals of shape (# of samples, # of channels)
+   
+   if workers!=1:
+      return MDCTsynfbparallel(y,fb,backend,dtype,workers)
+   if backend=='fft':
+      return profiled('MDCTsynfbfft',MDCTsynfbfft,y,fb,dtype)
+   elif backend!='polmat':
+      raise ValueError("Unknown backend '%s', use 'polmat' or 'fft'." % backend)
+   N=y.shape[-2]
+   plan=getMDCTplan(N,fb)
+   #closed form inverse of the Fa matrix for synthesis:
+   Fs,Dinv=plan.matrices(dtype)[2:]
+   y=np.asarray(y,dtype=dtype)
+
+   multichannel=(y.ndim==3)
+   if not multichannel:
+      #add first dimension to y for polmatmult:
+      y=np.expand_dims(y,axis=0)
+   xp=profiled('DCT4',DCT4channels,y)
+   xp=profiled('polmatmult Dinv',polmatmult,xp,Dinv)
+   xp=profiled('polmatmult Fs',polmatmult,xp,Fs)
+   if multichannel:
+      xr=profiled('polyphase2x',polyphase2multichannel,xp)
+   else:
+      xr=profiled('polyphase2x',polyphase2x,xp)
+   return xr.astype(dtype,copy=False)
+
+def MDCTsynstream(blocks,fb):
+   #Streaming MDCT synthesis filter bank, the counterpart of MDCTanastream.
+   #Keeps the delay line state of Dinv(z) between the chunks of blocks, the concatenated
+   #output is bit-identical to MDCTsynfb applied to all blocks at once.
+   #Arguments: blocks: iterable of 2-d arrays of blocks of subbands, each of shape (N, # of blocks)
+   #fb: coefficients for the MDCT filter bank, np.array with 1.5*N coefficients.
+   #yields xr, the reconstructed signal for each chunk of blocks, 1-d arrays,
+   #the last one is the block which is still in the delay line at the end.
+   
+   N=int(len(fb)/1.5)
+   plan=getMDCTplan(N,fb)
+   Fs=plan.Fs
+   Dinv=plan.Dinv
+   #memory of Dinv(z), the last block after the DCT4 (None before the first block):
+   z=None
+   for y in blocks:
+      L=y.shape[1]
+      if L==0:
+         continue
+      xp=DCT4(np.expand_dims(y,axis=0))
+      if z is None:
+         xd=polmatmult(xp,Dinv)[:,:,:L]
+      else:
+         xd=polmatmult(np.concatenate((z,xp),axis=2),Dinv)[:,:,1:(L+1)]
+      z=xp[:,:,-1:]
+      xd=polmatmult(xd,Fs)
+      yield polyphase2x(xd)
+   #flush the delay line, the last block of MDCTsynfb:
+   if z is not None:
+      xd=polmatmult(z,Dinv)[:,:,1:]
+      xd=polmatmult(xd,Fs)
+      yield polyphase2x(xd)
+
+
+#Precomputed filter bank plans, for repeated calls with the same coefficients:
+
+class MDCTplan:
+   #Everything of the MDCT filter bank with N subbands and coefficients fb which does not
+   #depend on the signal: the F matrix and its closed form inverse, the delay matrices,
+   #the 2x2 matrices of F and the twiddle factors for DCT4fft.
+   #The arrays are read-only, since plans are shared through the cache of getMDCTplan.
+   def __init__(self,N,fb):
+      self.N=N
+      self.Fa=symFmatrix(fb)
+      self.D=Dmatrix(N)
+      self.Dinv=Dinvmatrix(N)
+      self.ra,self.rb,self.ca,self.cb,self.M=Fpairs(self.Fa)
+      M=self.M
+      #closed form inverse of the 2x2 matrices, as in symFinvmatrix:
+      det=M[0,0]*M[1,1]-M[0,1]*M[1,0]
+      self.Minv=np.array([[M[1,1],-M[0,1]],[-M[1,0],M[0,0]]])/det
+      #synthesis F matrix from the inverted 2x2 matrices, instead of a general matrix inverse:
+      Fs=np.zeros((N,N))
+      Fs[self.ca,self.ra]=self.Minv[0,0]
+      Fs[self.cb,self.ra]=self.Minv[1,0]
+      Fs[self.ca,self.rb]=self.Minv[0,1]
+      Fs[self.cb,self.rb]=self.Minv[1,1]
+      self.Fs=np.expand_dims(Fs, axis=-1)
+      self.twiddles=DCT4twiddles(N)
+      for a in (self.Fa,self.Fs,self.D,self.Dinv,self.M,self.Minv)+self.twiddles:
+         a.setflags(write=False)
+      #the matrices of the reference backend for each dtype, see matrices:
+      self.converted={np.dtype(np.float64):(self.Fa,self.D,self.Fs,self.Dinv)}
+
+   def matrices(self,dtype):
+      #returns the matrices Fa, D, Fs and Dinv of the reference backend in dtype, converted once
+      dtype=np.dtype(dtype)
+      m=self.converted.get(dtype)
+      if m is None:
+         m=tuple(a.astype(dtype) for a in (self.Fa,self.D,self.Fs,self.Dinv))
+         for a in m:
+            a.setflags(write=False)
+         self.converted[dtype]=m
+      return m
+
+#Maximum number of plans kept in the cache:
+MDCTplancachesize=32
+_MDCTplans=OrderedDict()
+_MDCTplanlock=threading.Lock()
+
+def getMDCTplan(N,fb):
+   #returns the MDCTplan for N subbands and the coefficients fb from a bounded LRU cache,
+   #which is keyed by N and a hash of the coefficients.
+   fb=np.ascontiguousarray(fb,dtype=float)
+   key=(N,hashlib.sha1(fb.tobytes()).hexdigest())
+   with _MDCTplanlock:
+      plan=_MDCTplans.get(key)
+      if plan is not None:
+         _MDCTplans.move_to_end(key)
+         return plan
+   plan=MDCTplan(N,fb)
+   with _MDCTplanlock:
+      _MDCTplans[key]=plan
+      while len(_MDCTplans)>MDCTplancachesize:
+         _MDCTplans.popitem(last=False)
+   return plan
+
+#Fast implementation, all blocks at once:
+
+def Fpairs(Fa):
+   #The diamond shaped F matrix from symFmatrix only couples the input samples N/2-1-j and N/2+j
+   #of each block with the outputs j and N-1-j, j=0...N/2-1, with a 2x2 matrix each.
+   #Argument: Fa: F matrix from symFmatrix, of shape (N,N,1)
+   #returns the index arrays ra, rb (inputs) and ca, cb (outputs) and
+   #the 2x2 matrices M of shape (2,2,N/2), such that [y_ca, y_cb] = [x_ra, x_rb] * M
+   
+   F=Fa[:,:,0]
+   N=F.shape[0]
+   j=np.arange(N//2)
+   ra=N//2-1-j
+   rb=N//2+j
+   ca=j
+   cb=N-1-j
+   M=np.array([[F[ra,ca],F[ra,cb]],[F[rb,ca],F[rb,cb]]])
+   return ra,rb,ca,cb,M
+
+def DCT4twiddles(N):
+   #pre- and post-twiddle factors of DCT4fft for blocks of length N
+   n=np.arange(N//2)
+   pre=np.exp(-1j*np.pi*(n+0.25)/N)
+   post=np.exp(-1j*np.pi*n/N)*np.sqrt(2.0/N)
+   return pre,post
+
+def DCT4fft(x,twiddles=None,out=None,work=None):
+   #Fast orthonormal DCT4 along the last axis, for all blocks (rows) of x at once.
+   #Uses pre- and post-twiddling around an N/2-point complex FFT, O(N log N) per block.
+   #Like DCT4 it is its own inverse.
+   #Arguments: x: array of blocks, of shape (...,N)
+   #twiddles: precomputed result of DCT4twiddles(N), computed if None
+   #out: array for the result, of the shape of x, which may be x itself, a new array if None
+   #work: complex array of shape (...,N/2) for the FFT, of the complex type of the result.
+   #With out and work, and twiddles of that type and of the shape of work (broadcasting needs
+   #buffers), no array is allocated, e.g. for real-time processing (with numpy 2, older versions
+   #allocate the result of the FFT).
+   #returns y, the DCT4 of each block, of the same shape as x.
+   #For float32 blocks the twiddles and the FFT are in complex64, the result is float32.
+   
+   if twiddles is None:
+      twiddles=DCT4twiddles(x.shape[-1])
+   dtype=np.float32 if x.dtype==np.float32 else np.float64
+   ctype=np.result_type(dtype,1j)
+   pre,post=twiddles
+   pre=pre.astype(ctype,copy=False)
+   post=post.astype(ctype,copy=False)
+   if work is None:
+      work=np.empty(x.shape[:-1]+(x.shape[-1]//2,),ctype)
+   if out is None:
+      out=np.empty(x.shape,dtype)
+   #even samples as real part, odd samples in reverse order as imaginary part:
+   v=work
+   v.real[...]=x[...,0::2]
+   v.imag[...]=x[...,::-1][...,0::2]
+   v*=pre
+   try:
+      np.fft.fft(v,axis=-1,out=v)
+   except TypeError:
+      #numpy before 2.0, without out:
+      v[...]=np.fft.fft(v,axis=-1)
+   v*=post
+   out[...,0::2]=v.real
+   np.negative(v.imag,out=v.imag)
+   out[...,::-1][...,0::2]=v.imag
+   return out
+
+def MDCTanafbfft(x,N,fb,dtype=np.float64):
+   #Fast MDCT analysis filter bank, computes the same as MDCTanafb (up to rounding errors).
+   #The folding with the F matrix, the delay D(z) and the DCT4 are computed for all blocks
+   #in a few vectorized operations, without polynomial matrix multiplications.
+   #Arguments: x: input signal, e.g. audio signal, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels)
+   #N: number of subbands
+   #fb: coefficients for the MDCT filter bank, for the F matrix, np.array with 1.5*N coefficients.
+   #dtype: np.float64, or np.float32 to compute everything in single precision, with half the
+   #memory traffic. For signals with amplitudes up to 1 and N<=2048 the float32 subbands differ
+   #from float64 by less than 1e-6 times the maximum subband magnitude, and the float32
+   #reconstruction by MDCTsynfbfft differs from the float64 one by less than 2e-6,
+   #well below the 16 bit quantization step of 3e-5.
+   #returns y, consisting of blocks of subband in in a 2-d array of shape (N,# of blocks),
+   #for multichannel signals a 3-d array of shape (# of channels, N, # of blocks)
+   
+   plan=getMDCTplan(N,fb)
+   ra,rb,ca,cb=plan.ra,plan.rb,plan.ca,plan.cb
+   M=plan.M.astype(dtype,copy=False)
+   x=np.asarray(x,dtype=dtype)
+   L=x.shape[0]//N
+   #blocks of the signal in rows, channels in the first dimension:
+   if x.ndim==1:
+      xb=np.reshape(x[:L*N],(L,N))
+   else:
+      xb=np.transpose(np.reshape(x[:L*N],(L,N,-1)),(2,0,1))
+   xa=xb[...,ra]
+   xb=xb[...,rb]
+   #folding with F, the first half is delayed by D(z), which appends one block:
+   y=np.zeros(xa.shape[:-2]+(L+1,N),dtype)
+   y[...,1:,ca]=xa*M[0,0]+xb*M[1,0]
+   y[...,:L,cb]=xa*M[0,1]+xb*M[1,1]
+   y=profiled('DCT4fft',DCT4fft,y,plan.twiddles)
+   return np.swapaxes(y,-1,-2)
+
+def MDCTsynfbfft(y,fb,dtype=np.float64):
+   #Fast MDCT synthesis filter bank, computes the same as MDCTsynfb (up to rounding errors).
+   #Uses DCT4fft, the delay Dinv(z) and the closed form inverses of the 2x2 matrices of F.
+   #Arguments: y: 2-d array of blocks of subbands, of shape (N, # of blocks),
+   #or a 3-d array of shape (# of channels, N, # of blocks) for multichannel signals
+   #fb: coefficients for the MDCT filter bank, np.array with 1.5*N coefficients.
+   #dtype: np.float64 or np.float32, see MDCTanafbfft for the error bounds
+   #returns xr, the reconstructed signal, a 1-d array,
+   #for multichannel signals of shape (# of samples, # of channels)
+   
+   y=np.asarray(y,dtype=dtype)
+   N,L=y.shape[-2:]
+   lead=y.shape[:-2]
+   plan=getMDCTplan(N,fb)
+   ra,rb,ca,cb=plan.ra,plan.rb,plan.ca,plan.cb
+   Minv=plan.Minv.astype(dtype,copy=False)
+   xp=profiled('DCT4fft',DCT4fft,np.swapaxes(y,-1,-2),plan.twiddles)
+   #the second half is delayed by Dinv(z), which appends one block:
+   ya=np.zeros(lead+(L+1,N//2),dtype)
+   yb=np.zeros(lead+(L+1,N//2),dtype)
+   ya[...,:L,:]=xp[...,ca]
+   yb[...,1:,:]=xp[...,cb]
+   #inverse of the 2x2 matrices:
+   xr=np.empty(lead+(L+1,N),dtype)
+   xr[...,ra]=ya*Minv[0,0]+yb*Minv[1,0]
+   xr[...,rb]=ya*Minv[0,1]+yb*Minv[1,1]
+   if y.ndim==3:
+      return np.reshape(xr,(y.shape[0],-1)).T
+   return np.reshape(xr,-1)
+
+
+#Parallel implementation, segments of the signal on a thread pool:
+#Output block t of the analysis depends only on the input blocks t-1 and t (the delay D(z) of
+#one block), and block t of the synthesis on the subband blocks t-1 and t (Dinv(z)). Hence each
+#segment of blocks is computed with one preceding block as overlap, and the first output block
+#of each segment but the first, which lacks its predecessor, is discarded. Each block is computed
+#with the same operations as in the serial call, such that the result is bit-identical.
+#The NumPy kernels (matrix multiplications, FFTs, element-wise operations) release the GIL,
+#so the threads run in parallel on several cores.
+
+def MDCTsegments(L,workers):
+   #returns the boundaries of the segments of L blocks for the threads, one segment per worker,
+   #and the number of workers, the number of CPUs if None, at most L
+   if workers is None:
+      workers=os.cpu_count() or 1
+   workers=max(1,min(workers,L))
+   return np.linspace(0,L,workers+1).astype(int),workers
+
+def MDCTrunsegments(task,workers):
+   #Calls task(k) for the segments k=0...workers-1 on a thread pool, and raises their exceptions
+   if workers==1:
+      task(0)
+      return
+   from concurrent.futures import ThreadPoolExecutor
+   with ThreadPoolExecutor(max_workers=workers) as pool:
+      for f in [pool.submit(task,k) for k in range(workers)]:
+         f.result()
+
+def MDCTanafbparallel(x,N,fb,backend='fft',dtype=np.float64,workers=None):
+   #MDCT analysis filter bank, parallel in segments of the signal, bit-identical to MDCTanafb.
+   #Arguments as for MDCTanafb, workers: number of threads, the number of CPUs if None
+   #returns y, as MDCTanafb
+   x=np.asarray(x)
+   L=x.shape[0]//N
+   bounds,workers=MDCTsegments(L,workers)
+   lead=(x.shape[1],) if x.ndim==2 else ()
+   y=np.empty(lead+(N,L+1),dtype)
+   def task(k):
+      b0,b1=bounds[k],bounds[k+1]
+      start=max(b0-1,0)
+      ys=MDCTanafb(x[(start*N):(b1*N)],N,fb,backend,dtype)
+      #the last segment also has the block at the end of the filter:
+      end=b1+(k==workers-1)
+      y[...,b0:end]=ys[...,(b0-start):(end-start)]
+   MDCTrunsegments(task,workers)
+   return y
+
+def MDCTsynfbparallel(y,fb,backend='fft',dtype=np.float64,workers=None):
+   #MDCT synthesis filter bank, parallel in segments of the subbands, bit-identical to MDCTsynfb.
+   #Arguments as for MDCTsynfb, workers: number of threads, the number of CPUs if None
+   #returns xr, as MDCTsynfb
+   N,L=y.shape[-2:]
+   bounds,workers=MDCTsegments(L,workers)
+   lead=(y.shape[0],) if y.ndim==3 else ()
+   xr=np.empty(((L+1)*N,)+lead,dtype)
+   def task(k):
+      b0,b1=bounds[k],bounds[k+1]
+      start=max(b0-1,0)
+      xs=MDCTsynfb(y[...,start:b1],fb,backend,dtype)
+      end=b1+(k==workers-1)
+      xr[(b0*N):(end*N)]=xs[((b0-start)*N):((end-start)*N)]
+   MDCTrunsegments(task,workers)
+   return xr
+
+
+#Testing:
+if __name__ == '__main__':
+   import numpy as np
+   import matplotlib.pyplot as plt
+
+   #Number of subbands:
+   N=4
+   D=Dmatrix(N)
+   Dinv=Dinvmatrix(N)
+   #Filter bank coefficients for sine window:
+   #fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   fb=np.loadtxt("MDCTcoeff.txt") #Coeff. from optimization
+   print("fb=", fb)
+   #input test signal, ramp:
+   x=np.arange(64)
+   plt.plot(x)
+   plt.title('Input Signal')
+   plt.xlabel('Sample')
+   plt.show()
+   y=MDCTanafb(x,N,fb); print("y=\n", y)
+   plt.imshow(np.abs(y))
+   plt.title('MDCT Subbands')
+   plt.xlabel('Block No.')
+   plt.ylabel('Subband No.')
+   plt.show()
+   xr=MDCTsynfb(y,fb)
+   plt.plot(xr)
+   plt.title('Reconstructed Signal')
+   plt.xlabel('Sample')
+   plt.show()
+   #Streaming in chunks of arbitrary length gives identical results:
+   chunks=(x[i:i+7] for i in range(0,len(x),7))
+   ys=np.hstack(list(MDCTanastream(chunks,N,fb)))
+   print("Streaming analysis identical:", np.array_equal(ys,y))
+   yblocks=(y[:,i:i+3] for i in range(0,y.shape[1],3))
+   xs=np.hstack(list(MDCTsynstream(yblocks,fb)))
+   print("Streaming synthesis identical:", np.array_equal(xs,xr))
+   #The fast backend computes the same up to rounding errors:
+   print("FFT backend analysis error:", np.max(np.abs(MDCTanafb(x,N,fb,backend='fft')-y)))
+   print("FFT backend synthesis error:", np.max(np.abs(MDCTsynfb(y,fb,backend='fft')-xr)))
+   #Multichannel signals, all channels at once:
+   x2=np.stack((x,-x),axis=1)
+   y2=MDCTanafb(x2,N,fb)
+   print("Multichannel analysis error:", np.max(np.abs(y2[0]-y)), np.max(np.abs(y2[1]+y)))
+   print("Multichannel synthesis error:", np.max(np.abs(MDCTsynfb(y2,fb)[:,0]-xr)))
+   #float32 precision of both backends, checked against the error bounds of MDCTanafbfft:
+   for backend in ('polmat','fft'):
+      for Nt in (N,512,2048):
+         fbt=fb if Nt==N else np.sin(np.pi/(2*Nt)*(np.arange(int(1.5*Nt))+0.5))
+         xt=np.random.uniform(-1,1,((20 if backend=='polmat' else 100)*Nt,2))
+         y64=MDCTanafb(xt,Nt,fbt,backend)
+         y32=MDCTanafb(xt,Nt,fbt,backend,dtype=np.float32)
+         xr64=MDCTsynfb(y64,fbt,backend)
+         xr32=MDCTsynfb(y32,fbt,backend,dtype=np.float32)
+         yerr=np.max(np.abs(y32-y64))/np.max(np.abs(y64))
+         xerr=np.max(np.abs(xr32-xr64))
+         print("float32 errors, %s, N=%d:" % (backend,Nt), yerr, xerr)
+         if y32.dtype!=np.float32 or xr32.dtype!=np.float32 or yerr>=1e-6 or xerr>=2e-6:
+            raise AssertionError("float32 results of the %s backend out of the error bounds" % backend)
+   #Parallel segments on threads, bit-identical to the serial filter bank:
+   for backend in ('polmat','fft'):
+      for xt in (np.random.randn(1000*N),np.random.randn(1000*N+3,2)):
+         yt=MDCTanafb(xt,N,fb,backend)
+         xrt=MDCTsynfb(yt,fb,backend)
+         for workers in (2,3,8,None):
+            assert np.array_equal(MDCTanafb(xt,N,fb,backend,workers=workers),yt)
+            assert np.array_equal(MDCTsynfb(yt,fb,backend,workers=workers),xrt)
+   print("Parallel analysis and synthesis identical")
+   y=np.zeros((4,16))
+   y[0,0]=1
+   xr=MDCTsynfb(y,fb)
+   plt.plot(xr[0:3*N])
+   plt.title('Impulse Response of Modulated Synthesis Subband 0')
+   plt.xlabel('Sample')
+   plt.show()
\ No newline at end of file
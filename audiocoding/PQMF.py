@@ -0,0 +1,237 @@
+#Functions to implement the Pseudo Quadrature Mirror Filter bank (PQMF), and to design its prototype filter.
+#File based, it computes all blocks of the audio signal at once, parallel to MDCTfb.py.
+#The PQMF is a cosine modulated filter bank with N subbands and a linear phase prototype filter h
+#of length L, a multiple of 2N, as designed with optimfuncQMF in the notebook AC_06_PQMF_FilterBank.
+#The analysis filters are
+#h_k(n)=sqrt(2/N)*h(n)*cos(pi/N*(k+0.5)*(n-(L-1)/2+N/2)),
+#which equals the phases of +-pi/4 of the PQMF up to the signs of the subbands. For L=2N and a
+#sine window this is the MDCT. The modulation is computed with a folding of each block of L samples
+#to N samples and DCT4fft. The synthesis filter bank is the transpose of the analysis filter bank,
+#hence the reconstruction is perfect up to the (small) aliasing and amplitude errors of the prototype.
+
+import numpy as np
+import os
+from numpy.lib.stride_tricks import sliding_window_view
+from .MDCTfb import DCT4fft
+
+def PQMFfolding(N,L):
+   #returns the index array perm and the signs, such that the modulation of a block u of L samples
+   #is the DCT4 of np.sum(np.reshape(u[perm]*signs,(N,L//N)),axis=-1)
+   t=np.arange(L)-L//2+N//2
+   q=t%(2*N)
+   sign=np.where((t//(2*N))%2==0,1.0,-1.0)
+   #the second half of each 2N samples is mirrored with a sign change:
+   second=(q>=N)
+   target=np.where(second,2*N-1-q,q)
+   sign=np.where(second,-sign,sign)
+   perm=np.argsort(target,kind='stable')
+   return perm,sign[perm]
+
+def PQMFanafb(x,N,h):
+   #PQMF analysis filter bank.
+   #Arguments: x: input signal, e.g. audio signal, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels)
+   #N: number of subbands
+   #h: prototype filter of length L, a multiple of 2N, e.g. from designPQMF
+   #returns y, consisting of blocks of subbands in a 2-d array of shape (N,# of blocks),
+   #for multichannel signals a 3-d array of shape (# of channels, N, # of blocks).
+   #It contains L/N-1 blocks more than the input, for the end of the filters.
+   x=np.asarray(x,dtype=float)
+   L=len(h)
+   B=x.shape[0]//N
+   perm,sign=PQMFfolding(N,L)
+   #channels in the first dimension:
+   xs=x[:B*N].T
+   pad=np.zeros(xs.shape[:-1]+(L-N,))
+   xs=np.concatenate((pad,xs,pad),axis=-1)
+   #blocks of L samples with a hop size of N, with the folding applied:
+   frames=sliding_window_view(xs,L,axis=-1)[...,::N,:][...,perm]
+   frames*=np.asarray(h)[perm]*sign
+   folded=np.sum(np.reshape(frames,frames.shape[:-1]+(N,L//N)),axis=-1)
+   y=DCT4fft(folded)
+   return np.swapaxes(y,-1,-2)
+
+def PQMFsynfb(y,h):
+   #PQMF synthesis filter bank.
+   #Arguments: y: 2-d array of blocks of subbands, of shape (N, # of blocks),
+   #or a 3-d array of shape (# of channels, N, # of blocks) for multichannel signals
+   #h: prototype filter, as for PQMFanafb
+   #returns xr, the reconstructed signal, a 1-d array of N*(# of blocks) samples,
+   #for multichannel signals of shape (# of samples, # of channels).
+   #The signal of PQMFanafb is reconstructed without delay, followed by the end of the filters.
+   N,nb=y.shape[-2:]
+   L=len(h)
+   perm,sign=PQMFfolding(N,L)
+   v=DCT4fft(np.swapaxes(y,-1,-2))
+   #unfolding, the transpose of the folding:
+   frames=np.empty(v.shape[:-1]+(L,))
+   frames[...,perm]=np.reshape(np.repeat(v,L//N,axis=-1)*sign*np.asarray(h)[perm],frames.shape)
+   #overlap-add of the blocks of L samples with a hop size of N:
+   frames=np.reshape(frames,frames.shape[:-1]+(L//N,N))
+   xr=np.zeros(v.shape[:-2]+(nb+L//N-1,N))
+   for j in range(L//N):
+      xr[...,j:(j+nb),:]+=frames[...,j,:]
+   xr=np.reshape(xr,xr.shape[:-2]+(-1,))[...,(L-N):(L-N+nb*N)]
+   return xr.T
+
+
+#Design of the prototype filter:
+#The prototype is symmetric, only its first half x of L/2 coefficients is optimized. Its magnitude
+#response is the amplitude response A(w)=C(w)*x with a precomputed matrix C for a frequency grid.
+#As in optimfuncQMF, the sum of the squared magnitudes of two neighbouring subbands should be
+#close to 2*N^2 (unity condition, which makes the filter bank orthogonal), and the attenuation
+#should be high after the next subband (stopband above 1.5*pi/N).
+
+#Default directory of the coefficient cache of designPQMF, in the cache directory of the user:
+PQMFcachedir=os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),'.cache'),
+                          'audiocoding','pqmfcoeffs')
+
+def PQMFgrid(N,L,gridsize=None):
+   #returns the matrices Cp and Cs of the amplitude response for the frequency grids of the
+   #unity condition in [0,pi/N], which is symmetric around pi/(2N), and of the stopband [1.5*pi/N, pi].
+   if gridsize is None:
+      gridsize=4*L
+   n=np.arange(L//2)-(L-1)/2.0
+   wp=np.pi/N*(np.arange(gridsize)+0.5)/gridsize
+   ws=np.linspace(1.5*np.pi/N,np.pi,int(gridsize*(N-1.5))+1)
+   Cp=2*np.cos(np.outer(wp,n))
+   Cs=2*np.cos(np.outer(ws,n))
+   return Cp,Cs
+
+def PQMFerror(x,N,Cp,Cs,weight):
+   #Error function of the prototype for the optimization, with its analytic gradient.
+   #x: first half of the prototype, Cp, Cs: from PQMFgrid,
+   #weight: weight of the stopband error against the unity condition
+   #returns err, the total (weighted) error, and its gradient with respect to x
+   A=np.dot(Cp,x)
+   #the grid is symmetric around pi/(2N), the neighbouring subband is the flipped response:
+   e=(A*A+A[::-1]*A[::-1])/(2.0*N*N)-1.0
+   As=np.dot(Cs,x)
+   err=np.mean(e*e)+weight*np.mean(As*As)/(2.0*N*N)
+   #e is symmetric, hence both terms of the unity condition have the same gradient:
+   grad=4.0/(N*N*len(e))*np.dot(e*A,Cp)+weight/(N*N*len(As))*np.dot(As,Cs)
+   return err,grad
+
+def PQMFstart(N,L):
+   #returns a starting point for the optimization, the first half of a windowed sinc lowpass
+   #filter with the cutoff frequency pi/(2N), scaled for the unity condition.
+   n=np.arange(L)-(L-1)/2.0
+   h=np.sinc(n/(2.0*N))*np.sin(np.pi/L*(np.arange(L)+0.5))
+   h*=np.sqrt(2.0)*N/np.sum(h)
+   return h[:(L//2)]
+
+#N, the matrices Cp, Cs and the weight of the design in the processes of designPQMF:
+PQMFworkerargs=[]
+
+def PQMFinitworker(N,Cp,Cs,weight):
+   #Initializer of the processes of designPQMF. The matrices (Cs has hundreds of MB for large N)
+   #are passed once to each process, not with each starting point.
+   PQMFworkerargs[:]=[N,Cp,Cs,weight]
+
+def PQMFoptimize(x0):
+   #Optimizes from the starting point x0, the task of one process of designPQMF, with the
+   #arguments from PQMFinitworker.
+   #returns the optimized first half of the prototype and its error
+   import scipy.optimize as opt
+   res=opt.minimize(PQMFerror,x0,args=tuple(PQMFworkerargs),jac=True,method='L-BFGS-B',
+                    options={'maxiter':5000})
+   return res.x,res.fun
+
+def designPQMF(N,L=None,weight=100.0,gridsize=None,starts=8,workers=None,seed=0,cache=True,cachedir=None):
+   #Designs the prototype filter of a PQMF filter bank with N subbands.
+   #Arguments: N: number of subbands
+   #L: length of the prototype, a multiple of 2N, 8N if None
+   #weight: weight of the stopband attenuation against the unity condition
+   #gridsize: number of frequencies of the grid in the passband, 4L if None
+   #starts: number of starting points of the optimization, the first one is a windowed sinc
+   #filter, the others are random variations of it
+   #workers: number of processes for the optimizations, the number of CPUs if None,
+   #1 computes them in this process
+   #seed: seed of the random starting points
+   #cache: if True, designs are loaded from and saved to the directory cachedir
+   #cachedir: directory of the cache, PQMFcachedir if None. If it is not writable, designs are
+   #not saved.
+   #returns h, the prototype filter of length L, for PQMFanafb and PQMFsynfb
+   if L is None:
+      L=8*N
+   if L%(2*N)!=0:
+      raise ValueError("The length L=%d of the prototype must be a multiple of 2N=%d." % (L,2*N))
+   if cachedir is None:
+      cachedir=PQMFcachedir
+   fileName=os.path.join(cachedir,'pqmf_N%d_L%d_w%g_g%s_s%d_r%d.txt' %
+                         (N,L,weight,gridsize,starts,seed))
+   if cache and os.path.exists(fileName):
+      return np.loadtxt(fileName)
+   Cp,Cs=PQMFgrid(N,L,gridsize)
+   x0=PQMFstart(N,L)
+   rng=np.random.RandomState(seed)
+   tasks=[x0*(1.0+(k>0)*0.1*rng.randn(L//2)) for k in range(starts)]
+   if workers==1:
+      PQMFinitworker(N,Cp,Cs,weight)
+      try:
+         results=list(map(PQMFoptimize,tasks))
+      finally:
+         del PQMFworkerargs[:]
+   else:
+      from concurrent.futures import ProcessPoolExecutor
+      workers=min(workers or os.cpu_count() or 1,starts)
+      with ProcessPoolExecutor(max_workers=workers,initializer=PQMFinitworker,
+                               initargs=(N,Cp,Cs,weight)) as pool:
+         results=list(pool.map(PQMFoptimize,tasks))
+   x=min(results,key=lambda r: r[1])[0]
+   h=np.append(x,x[::-1])
+   if cache:
+      #write to a temporary file first, such that no incomplete file is in the cache:
+      tmpName=fileName+'.%d.tmp' % os.getpid()
+      try:
+         os.makedirs(cachedir,exist_ok=True)
+         np.savetxt(tmpName,h)
+         os.replace(tmpName,fileName)
+      except OSError:
+         #e.g. a read-only directory, the design is only returned
+         if os.path.exists(tmpName):
+            os.remove(tmpName)
+   return h
+
+
+#Testing:
+if __name__ == '__main__':
+   import time
+   N=4
+   #Modulation by folding and DCT4 compared to the analysis filters:
+   L=8*N
+   h=PQMFstart(N,L)
+   h=np.append(h,h[::-1])
+   n=np.arange(L)
+   hk=np.sqrt(2.0/N)*h*np.cos(np.pi/N*np.outer(np.arange(N)+0.5,n-(L-1)/2.0+N/2))
+   x=np.random.randn(64*N)
+   xp=np.concatenate((np.zeros(L-N),x,np.zeros(L-N)))
+   ydirect=np.array([np.dot(hk,xp[(m*N):(m*N+L)]) for m in range(64+L//N-1)]).T
+   print("Folding error:", np.max(np.abs(PQMFanafb(x,N,h)-ydirect)))
+   #Analytic gradient compared to finite differences:
+   Cp,Cs=PQMFgrid(N,L)
+   x0=h[:L//2]
+   err,grad=PQMFerror(x0,N,Cp,Cs,100.0)
+   eps=1e-6
+   fd=np.array([(PQMFerror(x0+eps*d,N,Cp,Cs,100.0)[0]-PQMFerror(x0-eps*d,N,Cp,Cs,100.0)[0])/(2*eps)
+                for d in np.eye(L//2)])
+   print("Gradient error:", np.max(np.abs(grad-fd))/np.max(np.abs(fd)))
+   #Design and reconstruction:
+   t=time.time()
+   h=designPQMF(N,cache=False)
+   print("Design time for N=%d, L=%d: %g s" % (N,len(h),time.time()-t))
+   y=PQMFanafb(x,N,h)
+   xr=PQMFsynfb(y,h)
+   print("Reconstruction SNR: %g dB" % (10*np.log10(np.sum(x**2)/np.sum((xr[:len(x)]-x)**2))))
+   t=time.time()
+   h=designPQMF(32,L=256,cache=False)
+   print("Design time for N=32, L=256: %g s" % (time.time()-t))
+   #The cache, in a temporary directory, and a directory which cannot be written (below a file),
+   #where the design is not saved:
+   import tempfile
+   tmpDir=tempfile.mkdtemp()
+   h=designPQMF(N,cachedir=tmpDir)
+   t=time.time()
+   print("Cached design identical:", np.array_equal(designPQMF(N,cachedir=tmpDir),h), "%g s" % (time.time()-t))
+   notWritable=os.path.join(tmpDir,os.listdir(tmpDir)[0],'pqmf')
+   print("Not writable cache directory:", np.array_equal(designPQMF(N,cachedir=notWritable),h))
@@ -0,0 +1,57 @@
+#Audio coding package of the tutorials: filter banks, audio I/O and the psychoacoustic model.
+#The submodules are only imported when they are used, such that importing the package is cheap,
+#e.g. for the workers of a process pool:
+#   import audiocoding
+#   y=audiocoding.MDCTanafb(x,N,fb)       #imports audiocoding.MDCTfb
+#   x,fs=audiocoding.AudioIO.wavRead('myWavFile.wav')
+#or directly from the submodules:
+#   from audiocoding.MDCTfb import MDCTanafb, MDCTsynfb
+#Submodules:
+#   primitives: polynomial matrix primitives, DCT4, Dmatrix, symFmatrix, polmatmult, x2polyphase...
+#   MDCTfb: MDCT filter bank, LDFB: low delay filter bank, PQMF: PQMF filter bank and its design,
+#   blockswitching: MDCT with block switching, blockprocessor: real-time block processing,
+#   IOMethods: audio I/O (AudioIO), psyacmodel: psychoacoustic model,
+#   perceptualcoder: perceptual audio coder, profiling: profiling of the stages,
+#   cache: content addressed on-disk cache of decoded audio and MDCT subbands,
+#   resampling: polyphase sampling rate conversion by rational factors
+
+import importlib
+
+submodules=('primitives','MDCTfb','LDFB','PQMF','blockswitching','blockprocessor','IOMethods',
+            'psyacmodel','perceptualcoder','profiling','cache','resampling')
+
+#The most used names of the submodules, which are available as attributes of the package:
+_names={
+   'primitives':('DCT4','Dmatrix','Dinvmatrix','symFmatrix','symFinvmatrix','polmatmult',
+                 'x2polyphase','polyphase2x'),
+   'MDCTfb':('MDCTanafb','MDCTsynfb','MDCTanastream','MDCTsynstream','MDCTanafbfft','MDCTsynfbfft',
+             'MDCTanafbparallel','MDCTsynfbparallel','getMDCTplan','DCT4fft'),
+   'LDFB':('LDFBanafb','LDFBsynfb','LDFBanastream','LDFBsynstream','loadLDFBcoeffs','LDFBdelay'),
+   'PQMF':('PQMFanafb','PQMFsynfb','designPQMF'),
+   'blockswitching':('MDCTanaswitch','MDCTsynswitch','transientDetector','blockTypes',
+                     'checkBlockTypes'),
+   'blockprocessor':('BlockProcessor','MemoryStream'),
+   'IOMethods':('AudioIO',),
+   'psyacmodel':('maskingThresholds','maskingThresholdsBark','maskingThreshold','psyacplan'),
+   'perceptualcoder':('perceptualEncode','perceptualDecode'),
+   'profiling':('Profiler','profiled','aggregateRecords'),
+   'cache':('Cache','cachedRead','cachedMDCT'),
+   'resampling':('resample','Resampler','resamplingFilter'),
+}
+_modules={name:module for module,names in _names.items() for name in names}
+
+__all__=list(submodules)+sorted(_modules)
+
+def __getattr__(name):
+   #Imports the submodule name, or the submodule of the attribute name, on first use
+   if name in submodules:
+      return importlib.import_module('.'+name,__name__)
+   if name in _modules:
+      value=getattr(importlib.import_module('.'+_modules[name],__name__),name)
+      #later accesses find it directly:
+      globals()[name]=value
+      return value
+   raise AttributeError("module %r has no attribute %r" % (__name__,name))
+
+def __dir__():
+   return sorted(set(globals())|set(__all__))
@@ -0,0 +1,268 @@
+#Real-time block processing with the MDCT filter bank, for audio streams like PyAudio streams.
+#The BlockProcessor keeps the delay line state of the filter bank in the object instead of
+#in function attributes or globals, hence several streams can run in one process, and it
+#preallocates its buffers, such that a block does not allocate arrays with dtype np.float64
+#(with numpy 2, whose FFT writes into a given array; its float32 FFT still copies the block).
+#Usage with PyAudio, instead of the loop of run_mdct in the notebooks:
+#   stream=p.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True, output=True,
+#                 frames_per_buffer=N)
+#   proc=BlockProcessor(N, fb, process=myprocessing, fs=RATE)
+#   proc.run(stream)
+
+import numpy as np
+import time
+from .MDCTfb import getMDCTplan, DCT4fft
+
+class BlockProcessor:
+   #Reads blocks of N samples (per channel) from a stream, computes the MDCT subbands of each
+   #block, lets the function process modify them, computes the synthesis MDCT and writes the
+   #block back to the stream. The output is delayed by N samples (one block) against the input.
+   #Arguments: N: number of subbands, also the block length of the stream
+   #fb: coefficients for the MDCT filter bank, np.array with 1.5*N coefficients
+   #process: function which gets the subbands of a block, of shape (N,), or (# of channels, N)
+   #for multichannel streams, and either changes them in place and returns None, or returns
+   #the processed subbands. If None, the subbands are not changed.
+   #channels: number of interleaved channels of the stream
+   #sampleType: sample type of the stream, np.int16 (paInt16), np.int32 (paInt32) or
+   #np.float32 (paFloat32). The samples are processed without scaling, e.g. between
+   #-32768 and 32767 for np.int16, and integer output is clipped to its range.
+   #fs: sampling rate, for the default deadline of a block, N/fs
+   #deadline: time in seconds for processing a block, before the stream under- or overruns.
+   #Blocks which take longer are counted in deadlineMisses. If None, N/fs if fs is given.
+   #dtype: np.float64 or np.float32 for the processing, see MDCTanafbfft
+   def __init__(self,N,fb,process=None,channels=1,sampleType=np.int16,fs=None,deadline=None,
+                dtype=np.float64):
+      self.N=N
+      self.process=process
+      self.channels=channels
+      self.sampleType=np.dtype(sampleType)
+      if deadline is None and fs is not None:
+         deadline=N/float(fs)
+      self.deadline=deadline
+      self.dtype=dtype
+      plan=getMDCTplan(N,fb)
+      #the index arrays ra, rb, ca and cb of the 2x2 matrices of plan are ranges, as slices the
+      #rows and columns are views, without copies:
+      self.ra=slice(N//2-1,None,-1)
+      self.rb=slice(N//2,N)
+      self.ca=slice(0,N//2)
+      self.cb=slice(N-1,N//2-1,-1)
+      #the rows of the 2x2 matrices, (0,0), (1,0), (0,1), (1,1), and the twiddle factors, repeated
+      #for all channels, since operations with broadcasting allocate buffers:
+      M=plan.M.astype(dtype)
+      self.M=tuple(np.tile(M[i,j],(channels,1)) for i,j in ((0,0),(1,0),(0,1),(1,1)))
+      Minv=plan.Minv.astype(dtype)
+      self.Minv=tuple(np.tile(Minv[i,j],(channels,1)) for i,j in ((0,0),(1,0),(0,1),(1,1)))
+      ctype=np.result_type(dtype,1j)
+      self.twiddles=tuple(np.tile(t.astype(ctype),(channels,1)) for t in plan.twiddles)
+      #preallocated buffers, all channels in the first dimension:
+      self.x=np.zeros((channels,N),dtype)
+      self.y=np.zeros((channels,N),dtype)
+      self.xp=np.zeros((channels,N),dtype)
+      self.xr=np.zeros((channels,N),dtype)
+      self.out=np.zeros((N,channels),self.sampleType)
+      self.tmp=np.zeros((channels,N//2),dtype)
+      self.tmp2=np.zeros((channels,N//2),dtype)
+      #contiguous copies of the reversed halves, since ufuncs on strided views allocate buffers:
+      self.xa=np.zeros((channels,N//2),dtype)
+      self.xb=np.zeros((channels,N//2),dtype)
+      self.work=np.zeros((channels,N//2),ctype)
+      if self.sampleType.kind=='i':
+         info=np.iinfo(self.sampleType)
+         self.limits=(info.min,info.max)
+      #delay line states of D(z) and Dinv(z):
+      self.za=np.zeros((channels,N//2),dtype)
+      self.zs=np.zeros((channels,N//2),dtype)
+      self.resetCounters()
+
+   def reset(self):
+      #Clears the delay lines, e.g. before a new stream, and the counters.
+      self.za[:]=0.0
+      self.zs[:]=0.0
+      self.resetCounters()
+
+   def resetCounters(self):
+      #Counters of the processed blocks and their processing time (latency) in seconds:
+      self.blocks=0
+      self.deadlineMisses=0
+      self.lastLatency=0.0
+      self.maxLatency=0.0
+      self.totalLatency=0.0
+
+   def meanLatency(self):
+      #returns the mean processing time of a block in seconds
+      if self.blocks==0:
+         return 0.0
+      return self.totalLatency/self.blocks
+
+   def analysis(self,x):
+      #MDCT analysis of one block x, of shape (# of channels, N), with the delay line of D(z),
+      #the same as MDCTanafbfft for one block. The subbands are written into self.y.
+      M00,M10,M01,M11=self.M
+      tmp,tmp2=self.tmp,self.tmp2
+      xa,xb=self.xa,self.xb
+      xa[:]=x[:,self.ra]
+      xb[:]=x[:,self.rb]
+      y=self.y
+      #the first half is delayed by D(z):
+      y[:,self.ca]=self.za
+      np.multiply(xa,M00,out=self.za)
+      np.multiply(xb,M10,out=tmp)
+      self.za+=tmp
+      np.multiply(xa,M01,out=tmp)
+      np.multiply(xb,M11,out=tmp2)
+      tmp+=tmp2
+      y[:,self.cb]=tmp
+      return DCT4fft(y,self.twiddles,out=y,work=self.work)
+
+   def synthesis(self,y):
+      #MDCT synthesis of the subbands y of one block, of shape (# of channels, N), with the
+      #delay line of Dinv(z), the same as MDCTsynfbfft for one block. Written into self.xr.
+      Minv00,Minv10,Minv01,Minv11=self.Minv
+      tmp,tmp2=self.tmp,self.tmp2
+      xp=DCT4fft(y,self.twiddles,out=self.xp,work=self.work)
+      ya=self.xa
+      ya[:]=xp[:,self.ca]
+      #the second half is delayed by Dinv(z), yb is the state of the previous block:
+      yb=self.zs
+      xr=self.xr
+      np.multiply(ya,Minv00,out=tmp)
+      np.multiply(yb,Minv10,out=tmp2)
+      tmp+=tmp2
+      xr[:,self.ra]=tmp
+      np.multiply(ya,Minv01,out=tmp)
+      np.multiply(yb,Minv11,out=tmp2)
+      tmp+=tmp2
+      xr[:,self.rb]=tmp
+      self.zs[:]=xp[:,self.cb]
+      return xr
+
+   def processBytes(self,data):
+      #Processes one block of the stream.
+      #Argument: data: bytes of N interleaved samples per channel, as from stream.read(N)
+      #returns the processed block as a bytes-like object of the same format, for stream.write.
+      #It is a view of a buffer which is reused for the next block.
+      start=time.perf_counter()
+      samples=np.frombuffer(data,dtype=self.sampleType)
+      #deinterleave into the channel rows:
+      self.x[:]=np.reshape(samples,(self.N,self.channels)).T
+      y=self.analysis(self.x)
+      if self.process is not None:
+         yp=self.process(y[0] if self.channels==1 else y)
+         if yp is not None:
+            y[:]=yp
+      xr=self.synthesis(y)
+      if self.sampleType.kind=='i':
+         np.rint(xr,out=xr)
+         np.clip(xr,self.limits[0],self.limits[1],out=xr)
+      self.out[:]=xr.T
+      latency=time.perf_counter()-start
+      self.blocks+=1
+      self.lastLatency=latency
+      self.totalLatency+=latency
+      if latency>self.maxLatency:
+         self.maxLatency=latency
+      if self.deadline is not None and latency>self.deadline:
+         self.deadlineMisses+=1
+      return self.out.data
+
+   def run(self,stream,numBlocks=None,stop=None):
+      #Reads, processes and writes blocks of the stream until numBlocks blocks are processed,
+      #the function stop returns True, or the stream returns no more data.
+      #Arguments: stream: object with the methods read(N) and write(data, N),
+      #like a PyAudio stream opened for input and output, or a MemoryStream
+      #numBlocks: number of blocks to process, None for no limit
+      #stop: function without arguments, e.g. lambda: toggle_run.value
+      #returns the number of processed blocks
+      count=0
+      blockBytes=self.N*self.channels*self.sampleType.itemsize
+      while numBlocks is None or count<numBlocks:
+         if stop is not None and stop():
+            break
+         data=stream.read(self.N)
+         if len(data)<blockBytes:
+            break
+         stream.write(self.processBytes(data),self.N)
+         count+=1
+      return count
+
+class MemoryStream:
+   #In-memory replacement of a PyAudio stream, e.g. for testing a BlockProcessor without
+   #sound card. Reads blocks from the bytes given as input and collects the written blocks.
+   #Arguments: data: bytes of the interleaved input samples
+   #channels, sampleType: as for the BlockProcessor
+   def __init__(self,data,channels=1,sampleType=np.int16):
+      self.data=bytes(data)
+      self.frameBytes=channels*np.dtype(sampleType).itemsize
+      self.pos=0
+      self.written=[]
+
+   def read(self,frames):
+      end=self.pos+frames*self.frameBytes
+      data=self.data[self.pos:end]
+      self.pos=end
+      return data
+
+   def write(self,data,frames=None):
+      self.written.append(bytes(data))
+
+   def output(self):
+      #returns all written bytes
+      return b''.join(self.written)
+
+
+#Testing:
+if __name__ == '__main__':
+   from .MDCTfb import MDCTanafb, MDCTsynfb
+   N=128
+   fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   #stereo test signal, 16 bit:
+   L=200
+   t=np.arange(L*N)
+   x=np.stack((8000*np.sin(2*np.pi*0.01*t), 4000*np.random.randn(L*N)),axis=1)
+   x=np.clip(np.round(x),-32768,32767).astype(np.int16)
+   stream=MemoryStream(x.tobytes(),channels=2)
+   proc=BlockProcessor(N,fb,channels=2,fs=32000)
+   print("Blocks:", proc.run(stream))
+   xr=np.reshape(np.frombuffer(stream.output(),dtype=np.int16),(-1,2))
+   #Perfect reconstruction with a delay of one block:
+   print("Reconstruction error:", np.max(np.abs(xr[N:].astype(int)-x[:-N])))
+   #The subbands are those of the file based filter bank:
+   subbands=[]
+   def keep(y):
+      subbands.append(y.copy())
+   proc=BlockProcessor(N,fb,process=keep)
+   proc.run(MemoryStream(x[:,0].tobytes()))
+   print("Subband error:", np.max(np.abs(np.array(subbands).T-MDCTanafb(x[:,0],N,fb)[:,:L])))
+   print("Latency: mean %g s, max %g s, deadline misses: %d" %
+         (proc.meanLatency(), proc.maxLatency, proc.deadlineMisses))
+   #Two independent streams in one process:
+   p1=BlockProcessor(N,fb)
+   p2=BlockProcessor(N,fb,process=lambda y: 0.5*y)
+   s1=MemoryStream(x[:,0].tobytes())
+   s2=MemoryStream(x[:,0].tobytes())
+   for i in range(L):
+      s1.write(p1.processBytes(s1.read(N)))
+      s2.write(p2.processBytes(s2.read(N)))
+   x1=np.frombuffer(s1.output(),dtype=np.int16).astype(int)
+   x2=np.frombuffer(s2.output(),dtype=np.int16).astype(int)
+   print("Independent streams error:", np.max(np.abs(x1[N:]-x[:-N,0])), np.max(np.abs(2*x2-x1)))
+   #No arrays are allocated per block after the first blocks, only small python objects,
+   #far less than the 16 kB of one block of the buffers:
+   if np.lib.NumpyVersion(np.__version__)>='2.0.0':
+      import tracemalloc
+      N=1024
+      fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+      proc=BlockProcessor(N,fb,channels=2)
+      blocks=[x[i*N:(i+1)*N].tobytes() for i in range(L*128//N)]
+      for data in blocks[:2]:
+         proc.processBytes(data)
+      tracemalloc.start()
+      base=tracemalloc.get_traced_memory()[0]
+      for data in blocks[2:]:
+         proc.processBytes(data)
+      peak=tracemalloc.get_traced_memory()[1]-base
+      tracemalloc.stop()
+      print("Peak memory of %d blocks: %d bytes" % (len(blocks)-2, peak))
+      if peak>4096:
+         raise AssertionError("a block allocates %d bytes" % peak)
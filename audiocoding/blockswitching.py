@@ -0,0 +1,231 @@
+#MDCT filter bank with block switching: long blocks for stationary signals, and short blocks
+#around transients to avoid pre-echoes, as in the window switching of the lecture.
+#File based, all frames of the signal are processed at once.
+#Each frame has a hop size of N long subbands and a window of length 2N, of one of the block types:
+#   LONG:  sine window of length 2N
+#   START: transition from long to short blocks, long rising half, flat part, short falling half, zeros
+#   SHORT: 8 (=N/Ns) short MDCTs with sine windows of length 2Ns, in the middle of the frame
+#   STOP:  transition from short to long blocks, the time reversed START window
+#The transforms use the folding of PQMF.py with the orthonormal DCT4fft, for long and short
+#blocks of all frames at once. The synthesis is the transpose of the analysis, followed by
+#overlap-add, hence the reconstruction is perfect and without delay in the file based processing.
+
+import numpy as np
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from .MDCTfb import DCT4fft
+from .PQMF import PQMFfolding
+
+#Block types:
+LONG=0
+START=1
+SHORT=2
+STOP=3
+
+@lru_cache(maxsize=8)
+def switchingWindows(N,Ns):
+   #Precomputed windows for N long and Ns short subbands.
+   #returns the read-only windows of the long block types, of shape (4,2N) with the rows indexed by
+   #the block type (the SHORT row is not used), and the short window of length 2Ns
+   longWin=np.sin(np.pi/(2*N)*(np.arange(2*N)+0.5))
+   shortWin=np.sin(np.pi/(2*Ns)*(np.arange(2*Ns)+0.5))
+   off=(N-Ns)//2
+   start=np.zeros(2*N)
+   start[:N]=longWin[:N]
+   start[N:(N+off)]=1.0
+   start[(N+off):(N+off+Ns)]=shortWin[Ns:]
+   windows=np.array([longWin,start,np.zeros(2*N),start[::-1]])
+   windows.setflags(write=False)
+   shortWin.setflags(write=False)
+   return windows,shortWin
+
+def transientDetector(x,Ns,threshold=10.0,history=8,floor=1e-8):
+   #Vectorized energy ratio transient detector.
+   #The energies of the high pass filtered signal (first difference) in segments of Ns samples
+   #are compared with the mean energy of the preceding history segments. The first segment has no
+   #preceding segments, it is not flagged.
+   #Arguments: x: signal, 1-dim., or multichannel (# of samples, # of channels), the energies are summed
+   #Ns: segment length, the short block length
+   #threshold: minimum energy ratio of a transient
+   #floor: minimum energy per sample of a transient, for signals between -1 and 1
+   #returns a boolean array with a flag for each segment
+   x=np.asarray(x,dtype=float)
+   #the first sample is repeated, such that the start of the signal is no step:
+   d=np.diff(x,axis=0,prepend=x[:1])
+   e=d*d
+   if e.ndim>1:
+      e=np.sum(e,axis=1)
+   S=len(e)//Ns
+   energy=np.sum(np.reshape(e[:S*Ns],(S,Ns)),axis=1)
+   #mean energy of the preceding segments, from a cumulative sum:
+   c=np.concatenate(([0.0],np.cumsum(energy)))
+   s=np.arange(S)
+   first=np.maximum(s-history,0)
+   previous=(c[s]-c[first])/np.maximum(s-first,1)
+   return (energy>threshold*previous)&(energy>floor*Ns)&(s>0)
+
+def blockTypes(transients,N,Ns,numFrames):
+   #Block types of the frames from the transient flags of the segments of Ns samples.
+   #A segment belongs to the frame whose window center is next to it, a frame with a transient
+   #is SHORT, the frames before and after short frames are START and STOP frames. A frame between
+   #two SHORT frames is SHORT too, there is no window for a transition in both directions.
+   #returns the block types of the frames, an uint8 array of length numFrames
+   seg=np.flatnonzero(transients)
+   #frame t has its window center at sample t*N of the signal:
+   frame=np.minimum(((seg*Ns+Ns//2)/float(N)+0.5).astype(int),numFrames-1)
+   short=np.zeros(numFrames,dtype=bool)
+   short[frame]=True
+   prevShort=np.concatenate(([False],short[:-1]))
+   nextShort=np.concatenate((short[1:],[False]))
+   short|=prevShort&nextShort
+   prevShort=np.concatenate(([False],short[:-1]))
+   nextShort=np.concatenate((short[1:],[False]))
+   types=np.full(numFrames,LONG,dtype=np.uint8)
+   types[nextShort]=START
+   types[prevShort]=STOP
+   types[short]=SHORT
+   return types
+
+def checkBlockTypes(types,numFrames):
+   #Checks the block types of the frames, given to MDCTanaswitch or MDCTsynswitch: numFrames types
+   #of LONG, START, SHORT or STOP, and each type followed by one which continues its window, a long
+   #falling half (LONG, STOP) by a long rising half (LONG, START), a short falling half (START,
+   #SHORT) by a short rising half (SHORT, STOP). Raises ValueError naming the first invalid frame.
+   #returns the block types as an uint8 array
+   types=np.asarray(types)
+   if types.ndim!=1 or len(types)!=numFrames:
+      raise ValueError('Block types of shape %s given, but %d frames.' % (types.shape,numFrames))
+   bad=np.flatnonzero(~np.isin(types,(LONG,START,SHORT,STOP)))
+   if len(bad)>0:
+      raise ValueError('Invalid block type %r of frame %d.' % (types[bad[0]].item(),bad[0]))
+   types=types.astype(np.uint8)
+   fallingShort=(types==START)|(types==SHORT)
+   risingShort=(types==SHORT)|(types==STOP)
+   bad=np.flatnonzero(fallingShort[:-1]!=risingShort[1:])
+   if len(bad)>0:
+      names=('LONG','START','SHORT','STOP')
+      t=bad[0]+1
+      raise ValueError('Block type %s of frame %d cannot follow %s of frame %d.' %
+                       (names[types[t]],t,names[types[t-1]],t-1))
+   return types
+
+def MDCTanaswitch(x,N=1024,Ns=128,types=None,threshold=10.0):
+   #MDCT analysis filter bank with block switching.
+   #Arguments: x: input signal, e.g. audio signal between -1 and 1, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels)
+   #N: number of subbands of the long blocks, Ns: number of subbands of the short blocks, N/Ns even
+   #types: block types of the frames, from the transientDetector and blockTypes if None,
+   #one for each of the len(x)/N+1 (rounded up) frames, see checkBlockTypes
+   #threshold: energy ratio of the transientDetector
+   #returns y, the subbands of the frames in a 2-d array of shape (N,# of frames), for multichannel
+   #signals of shape (# of channels, N, # of frames). A SHORT frame contains the N/Ns short blocks,
+   #y[:,t].reshape(N//Ns,Ns) are their subbands.
+   #And types, the block type of each frame, an uint8 array.
+   x=np.asarray(x,dtype=float)
+   numFrames=-(-x.shape[0]//N)+1
+   if types is None:
+      types=blockTypes(transientDetector(x,Ns,threshold),N,Ns,numFrames)
+   types=checkBlockTypes(types,numFrames)
+   windows,shortWin=switchingWindows(N,Ns)
+   #channels in the first dimension, one block of zeros in front:
+   xs=x.T
+   xs=np.concatenate((np.zeros(xs.shape[:-1]+(N,)),xs,
+                      np.zeros(xs.shape[:-1]+((numFrames+1)*N-N-xs.shape[-1],))),axis=-1)
+   frames=sliding_window_view(xs,2*N,axis=-1)[...,::N,:]
+   y=np.empty(frames.shape[:-1]+(N,))
+   isShort=(types==SHORT)
+   #long, start and stop frames:
+   perm,sign=PQMFfolding(N,2*N)
+   u=frames[...,~isShort,:]*windows[types[~isShort]]
+   y[...,~isShort,:]=DCT4fft(np.sum(np.reshape(u[...,perm]*sign,u.shape[:-1]+(N,2)),axis=-1))
+   #short frames, the short blocks in the middle of the frame:
+   M=N//Ns
+   off=(N-Ns)//2
+   perm,sign=PQMFfolding(Ns,2*Ns)
+   sb=sliding_window_view(frames[...,isShort,off:(off+(M+1)*Ns)],2*Ns,axis=-1)[...,::Ns,:]*shortWin
+   ys=DCT4fft(np.sum(np.reshape(sb[...,perm]*sign,sb.shape[:-1]+(Ns,2)),axis=-1))
+   y[...,isShort,:]=np.reshape(ys,ys.shape[:-2]+(N,))
+   return np.swapaxes(y,-1,-2),types
+
+def MDCTsynswitch(y,types,Ns=128):
+   #MDCT synthesis filter bank with block switching.
+   #Arguments: y: subbands of the frames, of shape (N,# of frames) or (# of channels, N, # of frames)
+   #types: block types of the frames, as from MDCTanaswitch
+   #Ns: number of subbands of the short blocks
+   #returns xr, the reconstructed signal, a 1-d array, for multichannel signals of shape
+   #(# of samples, # of channels). The input of MDCTanaswitch is reconstructed without delay.
+   N,T=y.shape[-2:]
+   types=checkBlockTypes(types,T)
+   windows,shortWin=switchingWindows(N,Ns)
+   Y=np.swapaxes(y,-1,-2)
+   isShort=(types==SHORT)
+   u=np.zeros(Y.shape[:-1]+(2*N,))
+   #long, start and stop frames, the transpose of the analysis:
+   perm,sign=PQMFfolding(N,2*N)
+   v=DCT4fft(Y[...,~isShort,:])
+   ul=np.empty(v.shape[:-1]+(2*N,))
+   ul[...,perm]=np.reshape(np.repeat(v,2,axis=-1)*sign,ul.shape)
+   u[...,~isShort,:]=ul*windows[types[~isShort]]
+   #short frames, overlap-add of the short blocks in the middle of the frame:
+   M=N//Ns
+   off=(N-Ns)//2
+   perm,sign=PQMFfolding(Ns,2*Ns)
+   v=DCT4fft(np.reshape(Y[...,isShort,:],Y.shape[:-2]+(-1,M,Ns)))
+   us=np.empty(v.shape[:-1]+(2*Ns,))
+   us[...,perm]=np.reshape(np.repeat(v,2,axis=-1)*sign,us.shape)
+   us*=shortWin
+   ushort=np.zeros(v.shape[:-2]+((M+1)*Ns,))
+   for j in range(M):
+      ushort[...,(j*Ns):(j*Ns+2*Ns)]+=us[...,j,:]
+   u[...,isShort,off:(off+(M+1)*Ns)]=ushort
+   #overlap-add of the frames with a hop size of N, without the block of zeros in front:
+   u=np.reshape(u,u.shape[:-1]+(2,N))
+   xr=np.zeros(Y.shape[:-2]+(T+1,N))
+   xr[...,:T,:]+=u[...,0,:]
+   xr[...,1:,:]+=u[...,1,:]
+   xr=np.reshape(xr[...,1:T,:],Y.shape[:-2]+(-1,))
+   return xr.T
+
+
+#Testing:
+if __name__ == '__main__':
+   import time
+   fs=44100
+   N=1024
+   Ns=128
+   #Test signal: a tone with castanet like clicks:
+   t=np.arange(5*fs)/float(fs)
+   x=0.2*np.sin(2*np.pi*440*t)
+   for c in (1.0,2.5,2.53,4.0):
+      i=int(c*fs)
+      x[i:(i+2000)]+=0.8*np.random.randn(2000)*np.exp(-np.arange(2000)/300.0)
+   start=time.time()
+   y,types=MDCTanaswitch(x,N,Ns)
+   xr=MDCTsynswitch(y,types,Ns)
+   print("Analysis and synthesis of %.1f s: %.3f s" % (len(x)/float(fs),time.time()-start))
+   print("Frames with transients:", np.flatnonzero(types==SHORT), "types around:",
+         [types[max(f-1,0):(f+2)].tolist() for f in np.flatnonzero(types==SHORT)])
+   print("Reconstruction error:", np.max(np.abs(xr[:len(x)]-x)))
+   #A stationary tone has only long blocks, also at its start:
+   print("Block types of a tone:", MDCTanaswitch(0.2*np.sin(2*np.pi*440*t[:3*N]),N,Ns)[1])
+   #Perfect reconstruction for arbitrary valid block type sequences, multichannel:
+   x2=np.random.randn(50*N,2)
+   types=np.array([LONG,START,SHORT,STOP,START,SHORT,SHORT,STOP,LONG]*6)[:51]
+   y2,types=MDCTanaswitch(x2,N,Ns,types)
+   print("Multichannel reconstruction error:", np.max(np.abs(MDCTsynswitch(y2,types,Ns)[:len(x2)]-x2)))
+   #Invalid block types are rejected, with the frame:
+   for ty in (types[:-1],np.where(types==LONG,4,types),np.where(types==START,SHORT,types),
+              np.where(types==STOP,LONG,types)):
+      try:
+         MDCTanaswitch(x2,N,Ns,ty)
+         raise AssertionError("invalid block types were accepted")
+      except ValueError as e:
+         print("Invalid block types:", e)
+   #Pre-echo: quantization noise before the transient, long blocks only against block switching:
+   i=int(2.5*fs)
+   numFrames=-(-len(x)//N)+1
+   for name,ty in (('long blocks',np.full(numFrames,LONG,dtype=np.uint8)),('block switching',None)):
+      y,ty=MDCTanaswitch(x,N,Ns,ty)
+      yq=np.round(y*20)/20
+      noise=MDCTsynswitch(yq,ty,Ns)[:len(x)]-x
+      print("Noise energy before the transient with %s: %g" % (name,np.sum(noise[(i-600):i]**2)))
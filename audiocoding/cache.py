@@ -0,0 +1,308 @@
+#Content addressed on-disk cache for decoded audio and MDCT spectra, opt-in for analysis runs which
+#read the same sources again and again:
+#   cache=Cache('myCacheDir',maxBytes=20*2**30)
+#   x,fs=cachedRead('song.mp3',cache,mono=True)
+#   y,fs=cachedMDCT('song.mp3',1024,fb,cache,mono=True)
+#The keys are hashes of the content of the source file and of the parameters (mono, segment,
+#dtype, and N, the hash of the coefficients fb and the backend for the MDCT), hence a changed or
+#renamed file is found correctly. The content hash of a file is remembered for its path, size and
+#modification time, such that a warm run does not read the sources at all.
+#Each entry is a .npy file, which is returned as read-only memory map, with its metadata in a
+#.json file next to it. All files are written to a temporary file first and then renamed, such that
+#several processes can share the cache. The total size is bounded by maxBytes, the least recently
+#used entries are removed first (the modification time of an entry is updated when it is used), the
+#remembered hashes of the files count too, and are removed in the same way. The cache directory is
+#not scanned for every write: a Cache keeps an estimate of the total size, from the last scan and its
+#own writes since, and scans it when the estimate exceeds maxBytes, and every scanInterval writes
+#for the writes of other processes, which can exceed maxBytes until then.
+
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+def hashParams(*parts):
+   #returns the hex hash of the JSON representation of parts
+   return hashlib.sha1(json.dumps(parts,sort_keys=True).encode('utf-8')).hexdigest()
+
+def hashArray(a):
+   #returns the hex hash of the contents, type and shape of the array a, e.g. of filter coefficients
+   a=np.ascontiguousarray(a)
+   h=hashlib.sha1(a.tobytes())
+   h.update(('%s%s' % (a.dtype.str,a.shape)).encode('ascii'))
+   return h.hexdigest()
+
+class Cache:
+   #On-disk cache of arrays in a directory.
+   #Arguments: directory: directory of the cache, created if it does not exist
+   #maxBytes: maximum total size of the entries in bytes, 10 GB by default
+   #scanInterval: number of writes after which the size of the cache directory is scanned again
+   def __init__(self,directory,maxBytes=10*2**30,scanInterval=100):
+      self.directory=directory
+      self.maxBytes=maxBytes
+      self.scanInterval=scanInterval
+      #estimated total size in bytes, None before the first scan, and the writes since the scan:
+      self.estimate=None
+      self.writes=0
+      self.lock=threading.Lock()
+      os.makedirs(os.path.join(directory,'hashes'),exist_ok=True)
+
+   def path(self,key,ext):
+      #returns the file name of an entry, in a sub directory of the first two characters of the key
+      return os.path.join(self.directory,key[:2],key+ext)
+
+   def writeAtomic(self,fileName,write):
+      #Calls write(f) for a temporary file, and renames it to fileName
+      #returns the size of the file in bytes
+      os.makedirs(os.path.dirname(fileName),exist_ok=True)
+      tmpName='%s.%d.%d.tmp' % (fileName,os.getpid(),threading.get_ident())
+      try:
+         with open(tmpName,'wb') as f:
+            write(f)
+            nbytes=f.tell()
+         os.replace(tmpName,fileName)
+         return nbytes
+      except BaseException:
+         if os.path.exists(tmpName):
+            os.remove(tmpName)
+         raise
+
+   def get(self,key):
+      #returns the array of the entry key as read-only memory map and its metadata dict,
+      #or None, None if the entry is not in the cache
+      fileName=self.path(key,'.npy')
+      try:
+         with open(self.path(key,'.json')) as f:
+            meta=json.load(f)
+         a=np.load(fileName,mmap_mode='r')
+         #used now, for the LRU eviction:
+         os.utime(fileName)
+      except (OSError,ValueError):
+         #missing, or removed by another process meanwhile
+         return None,None
+      return a,meta
+
+   def put(self,key,a,meta=None):
+      #Stores the array a with the JSON serializable dict meta as entry key, and removes the least
+      #recently used entries if the cache is larger than maxBytes.
+      #returns the stored array as read-only memory map, or a as read-only array if it is larger
+      #than maxBytes, which is not stored, or if the entry was removed by another process meanwhile
+      if np.asarray(a).nbytes>self.maxBytes:
+         return self.readOnly(a)
+      #the metadata first, an entry is complete when its .npy file exists:
+      nbytes=self.writeAtomic(self.path(key,'.json'),lambda f: f.write(json.dumps(meta or {}).encode('utf-8')))
+      nbytes+=self.writeAtomic(self.path(key,'.npy'),lambda f: np.save(f,np.asarray(a)))
+      self.written(nbytes)
+      try:
+         return np.load(self.path(key,'.npy'),mmap_mode='r')
+      except OSError:
+         return self.readOnly(a)
+
+   @staticmethod
+   def readOnly(a):
+      #returns a read-only view of the array a, like the memory maps of the entries
+      a=np.asarray(a).view()
+      a.setflags(write=False)
+      return a
+
+   def entries(self):
+      #returns a list of (modification time, size in bytes, key) of the entries
+      entries=[]
+      for sub in os.listdir(self.directory):
+         if len(sub)!=2:
+            continue
+         for name in os.listdir(os.path.join(self.directory,sub)):
+            if not name.endswith('.npy'):
+               continue
+            try:
+               st=os.stat(os.path.join(self.directory,sub,name))
+               meta=os.stat(os.path.join(self.directory,sub,name[:-4]+'.json'))
+            except OSError:
+               continue
+            entries.append((st.st_mtime,st.st_size+meta.st_size,name[:-4]))
+      return entries
+
+   def memos(self):
+      #returns a list of (modification time, size in bytes, file name) of the remembered file hashes
+      memos=[]
+      directory=os.path.join(self.directory,'hashes')
+      for name in os.listdir(directory):
+         try:
+            st=os.stat(os.path.join(directory,name))
+         except OSError:
+            continue
+         memos.append((st.st_mtime,st.st_size,os.path.join(directory,name)))
+      return memos
+
+   def size(self):
+      #returns the total size of the entries and of the remembered file hashes in bytes
+      return sum(e[1] for e in self.entries()+self.memos())
+
+   def written(self,nbytes):
+      #Adds nbytes written into the cache to the estimated size, and scans the cache directory and
+      #removes the least recently used entries with evict if the estimate exceeds maxBytes, before
+      #the first write, or every scanInterval writes
+      with self.lock:
+         self.writes+=1
+         scan=self.estimate is None or self.writes>=self.scanInterval
+         if not scan:
+            self.estimate+=nbytes
+            scan=self.estimate>self.maxBytes
+      if scan:
+         self.evict()
+
+   def evict(self):
+      #Removes the least recently used entries and remembered file hashes until the total size is
+      #at most maxBytes, and sets the estimated size to the remaining total size
+      #the .npy file of an entry first, without it the entry is not found any more:
+      files=[(mtime,size,(self.path(key,'.npy'),self.path(key,'.json'))) for mtime,size,key in self.entries()]
+      files+=[(mtime,size,(fileName,)) for mtime,size,fileName in self.memos()]
+      total=sum(f[1] for f in files)
+      for mtime,size,fileNames in sorted(files):
+         if total<=self.maxBytes:
+            break
+         for fileName in fileNames:
+            try:
+               os.remove(fileName)
+            except OSError:
+               #removed by another process meanwhile
+               pass
+         total-=size
+      with self.lock:
+         self.estimate=total
+         self.writes=0
+
+   def clear(self):
+      #Removes all entries
+      self.maxBytes,maxBytes=0,self.maxBytes
+      try:
+         self.evict()
+      finally:
+         self.maxBytes=maxBytes
+
+   def fileHash(self,fileName):
+      #returns the hex hash of the content of the file. It is remembered in the cache for the
+      #path, size and modification time of the file, such that it is only computed once.
+      st=os.stat(fileName)
+      statKey=hashParams(os.path.abspath(fileName),st.st_size,st.st_mtime_ns)
+      memo=os.path.join(self.directory,'hashes',statKey)
+      try:
+         with open(memo) as f:
+            digest=f.read()
+         #used now, for the LRU eviction:
+         os.utime(memo)
+         return digest
+      except OSError:
+         pass
+      h=hashlib.sha1()
+      with open(fileName,'rb') as f:
+         for chunk in iter(lambda: f.read(1<<20),b''):
+            h.update(chunk)
+      digest=h.hexdigest()
+      self.written(self.writeAtomic(memo,lambda f: f.write(digest.encode('ascii'))))
+      return digest
+
+def cachedRead(fileName,cache,mono=False,startSec=None,endSec=None,dtype=np.float64):
+   #Reads an audio file like AudioIO.wavRead (.wav files) or AudioIO.audioRead (other formats),
+   #through the cache.
+   #Arguments: fileName: audio file, cache: Cache, or None to read without the cache
+   #mono, startSec, endSec, dtype: as for AudioIO.wavRead
+   #returns the samples, a read-only memory map for cached files, and the sampling rate
+   from .IOMethods import AudioIO
+   read=AudioIO.wavRead if os.path.splitext(fileName)[1].lower()=='.wav' else AudioIO.audioRead
+   if cache is None:
+      return read(fileName,mono=mono,startSec=startSec,endSec=endSec,dtype=dtype)
+   key=hashParams('audio',cache.fileHash(fileName),mono,startSec,endSec,np.dtype(dtype).str)
+   x,meta=cache.get(key)
+   if x is not None:
+      return x,meta['fs']
+   x,fs=read(fileName,mono=mono,startSec=startSec,endSec=endSec,dtype=dtype)
+   return cache.put(key,x,{'fs':fs}),fs
+
+def cachedMDCT(fileName,N,fb,cache,backend='fft',mono=False,startSec=None,endSec=None,dtype=np.float64):
+   #MDCT subbands of an audio file with MDCTanafb, through the cache. Only the subbands are cached,
+   #not the samples, which would double the size of the entries, cachedRead caches the samples.
+   #If the subbands are not in the cache, the file is read again.
+   #Arguments: fileName: audio file, N: number of subbands, fb: coefficients of the filter bank
+   #cache: Cache, or None to compute without the cache
+   #backend: backend of MDCTanafb, mono, startSec, endSec, dtype: as for AudioIO.wavRead
+   #returns the subbands as MDCTanafb, a read-only memory map for cached results, and the sampling rate
+   from .MDCTfb import MDCTanafb
+   if cache is None:
+      x,fs=cachedRead(fileName,None,mono,startSec,endSec,dtype)
+      return MDCTanafb(x,N,fb,backend=backend,dtype=dtype),fs
+   key=hashParams('mdct',cache.fileHash(fileName),mono,startSec,endSec,np.dtype(dtype).str,
+                  N,hashArray(np.asarray(fb,dtype=float)),backend)
+   y,meta=cache.get(key)
+   if y is not None:
+      return y,meta['fs']
+   x,fs=cachedRead(fileName,None,mono,startSec,endSec,dtype)
+   y=MDCTanafb(x,N,fb,backend=backend,dtype=dtype)
+   return cache.put(key,y,{'fs':fs}),fs
+
+
+#Testing:
+if __name__ == '__main__':
+   import tempfile
+   import time
+   from concurrent.futures import ThreadPoolExecutor
+   from .IOMethods import AudioIO
+   from .MDCTfb import MDCTanafb
+   tmpDir=tempfile.mkdtemp()
+   N=1024
+   fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   fileName=os.path.join(tmpDir,'test.wav')
+   AudioIO.wavWrite(np.random.uniform(-0.5,0.5,(44100*30,2)),44100,24,fileName)
+   cache=Cache(os.path.join(tmpDir,'cache'))
+   for run in ('cold','warm'):
+      start=time.time()
+      y,fs=cachedMDCT(fileName,N,fb,cache)
+      print("%s run: %.4f s" % (run,time.time()-start))
+   x,fs=AudioIO.wavRead(fileName)
+   print("Identical to MDCTanafb:", np.array_equal(y,MDCTanafb(x,N,fb,backend='fft')), type(y).__name__)
+   #other parameters are other entries:
+   ym,fs=cachedMDCT(fileName,N,fb,cache,mono=True)
+   print("Mono:", ym.shape, "entries:", len(cache.entries()))
+   #a changed file is not found in the cache:
+   AudioIO.wavWrite(np.zeros((44100,2)),44100,16,fileName)
+   y,fs=cachedMDCT(fileName,N,fb,cache)
+   print("Changed file:", y.shape, np.max(np.abs(y)))
+   #concurrent writers of the same entries:
+   cache.clear()
+   with ThreadPoolExecutor(4) as pool:
+      results=list(pool.map(lambda k: cachedMDCT(fileName,N,fb,cache)[0],range(8)))
+   print("Concurrent writers identical:", all(np.array_equal(r,results[0]) for r in results))
+   #LRU eviction:
+   small=Cache(os.path.join(tmpDir,'small'),maxBytes=3*8000+1000)
+   for k in range(5):
+      small.put('%040x' % k,np.zeros(1000))
+      time.sleep(0.01)
+   #entry 2 is used, the oldest is 3 then:
+   small.get('%040x' % 2)
+   time.sleep(0.01)
+   small.put('%040x' % 5,np.zeros(1000))
+   print("Kept after eviction:", sorted(int(e[2],16) for e in small.entries()), "size:", small.size())
+   #an entry larger than the cache is returned, but not stored:
+   a=small.put('%040x' % 6,np.arange(10000.0))
+   print("Larger than the cache:", np.array_equal(a,np.arange(10000.0)), a.flags.writeable, len(small.entries()))
+   #the remembered file hashes count for the size, and are evicted too (with the next put):
+   tiny=Cache(os.path.join(tmpDir,'tiny'),maxBytes=100)
+   for k in range(5):
+      tiny.fileHash(fileName)
+      AudioIO.wavWrite(np.zeros((100,2)),44100,16,fileName+'%d.wav' % k)
+      tiny.fileHash(fileName+'%d.wav' % k)
+   print("Remembered hashes:", len(tiny.memos()), "size:", tiny.size())
+   tiny.evict()
+   print("After eviction:", len(tiny.memos()), "size:", tiny.size())
+   #the cache directory is scanned before the first write and every scanInterval writes, not for
+   #every write:
+   counted=Cache(os.path.join(tmpDir,'counted'),scanInterval=50)
+   scans=[]
+   entries=counted.entries
+   counted.entries=lambda: scans.append(1) or entries()
+   for k in range(200):
+      counted.put('%040x' % k,np.zeros(10))
+   print("Scans for 200 writes:", len(scans), "estimated size:", counted.estimate, "size:", counted.size())
+   if len(scans)>5:
+      raise AssertionError("the cache is scanned for every write")
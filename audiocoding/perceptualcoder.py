@@ -0,0 +1,261 @@
+#A perceptual audio coder from the parts of the tutorials: MDCT filter bank, psycho-acoustic model,
+#quantization and entropy coding, with all frames processed at once in vectorized operations.
+#Encoder: MDCTanafb -> masking threshold per Bark band and frame (maskingThresholdsBark of the MDCT
+#magnitudes) -> step sizes -> mid-tread quantization -> adaptive Golomb-Rice coding -> bytes.
+#Decoder: bytes -> Golomb-Rice decoding -> de-quantization -> MDCTsynfb.
+#The step size of a Bark band in a frame is chosen such that the quantization noise power,
+#step^2/12 for a uniform quantizer, stays below the masking threshold. It is transmitted as a
+#scale factor sf with step=2^(sf/4), in steps of 1.5 dB.
+#The quality scale: quality=1 puts the quantization noise at the masking threshold of the
+#psycho-acoustic model, whose spreading functions are 23.5 dB below the masker, and each doubling
+#of quality lowers the noise by about 6 dB, for more bits. The noise of a band whose coefficients
+#are mostly smaller than the step is larger than step^2/12, hence at quality=1 a pure tone is
+#decoded with an SNR of only about 16 dB (a 700 Hz tone: 16 dB at 12 kbit/s, quality=4: 26 dB).
+#For tonal signals, quality=4 or more is recommended.
+#The quantization indices of each Bark band and frame are coded with a Golomb-Rice code with the
+#parameter k which gives the fewest bits for this band, or not at all if they are all zero.
+#The unary parts and the k low bits of the Rice codes are written into two separate bit streams,
+#such that encoding and decoding need no loop over the symbols: the unary parts are decoded from
+#the positions of the zeros, the low bits from the positions given by the known k of each symbol.
+
+import numpy as np
+import struct
+from .MDCTfb import MDCTanafb, MDCTsynfb
+from .psyacmodel import psyacplan, maskingThresholdsBark
+
+#Signals between -1 and 1 are scaled to 16 bit integer range, the range of the psycho-acoustic model:
+signalScale=32768.0
+#Largest Rice parameter k:
+maxRiceParameter=15
+_magic=b'PAC1'
+_header=struct.Struct('<4sIHHBQI')
+_blockHeader=struct.Struct('<III')
+
+#Golomb-Rice coding of whole arrays:
+
+def zigzag(q):
+   #Maps signed integers to unsigned: 0,-1,1,-2,2,... -> 0,1,2,3,4,...
+   q=np.asarray(q,dtype=np.int64)
+   return (q<<1)^(q>>63)
+
+def unzigzag(u):
+   #Inverse of zigzag
+   u=np.asarray(u,dtype=np.int64)
+   return (u>>1)^-(u&1)
+
+def riceEncode(u,k):
+   #Golomb-Rice coding of the non-negative integers u, flattened, with the parameters k (an array
+   #of the same length, or a scalar).
+   #returns bytes: the numbers of symbols and bytes of both streams, the unary parts
+   #(u>>k ones followed by a zero for each symbol), and the k low bits of each symbol.
+   u=np.ravel(np.asarray(u,dtype=np.int64))
+   k=np.broadcast_to(np.asarray(k,dtype=np.int64),u.shape)
+   m=u>>k
+   #unary parts: ones, with a zero at the end of each symbol:
+   unary=np.ones(int(np.sum(m))+len(u),dtype=np.uint8)
+   unary[np.cumsum(m+1)-1]=0
+   #low bits, most significant bit first:
+   low=np.zeros(int(np.sum(k)),dtype=np.uint8)
+   start=np.cumsum(k)-k
+   for j in range(int(np.max(k,initial=0))):
+      sel=k>j
+      low[start[sel]+k[sel]-1-j]=(u[sel]>>j)&1
+   unaryBytes=np.packbits(unary).tobytes()
+   lowBytes=np.packbits(low).tobytes()
+   return _blockHeader.pack(len(u),len(unaryBytes),len(lowBytes))+unaryBytes+lowBytes
+
+def riceDecode(data,offset,k):
+   #Decodes a block of riceEncode which starts at offset in data.
+   #k: the parameters of the symbols, an array of the length of the block, or a scalar
+   #returns u, the decoded integers, and the offset after the block
+   count,unaryLen,lowLen=_blockHeader.unpack_from(data,offset)
+   offset+=_blockHeader.size
+   unary=np.unpackbits(np.frombuffer(data,dtype=np.uint8,count=unaryLen,offset=offset))
+   offset+=unaryLen
+   low=np.unpackbits(np.frombuffer(data,dtype=np.uint8,count=lowLen,offset=offset))
+   offset+=lowLen
+   #the number of ones before each zero are the unary parts:
+   zeros=np.flatnonzero(unary==0)[:count]
+   if len(zeros)<count:
+      raise ValueError('Corrupt bit stream, %d of %d symbols found.' % (len(zeros),count))
+   m=np.diff(zeros,prepend=-1)-1
+   k=np.broadcast_to(np.asarray(k,dtype=np.int64),(count,))
+   u=m.astype(np.int64)<<k
+   start=np.cumsum(k)-k
+   for j in range(int(np.max(k,initial=0))):
+      sel=k>j
+      u[sel]|=low[start[sel]+k[sel]-1-j].astype(np.int64)<<j
+   return u,offset
+
+#Quantization:
+
+def bandLayout(fs,N,nfilts):
+   #returns the Bark band of each of the N MDCT subbands, the index of the first subband of each
+   #non-empty Bark band, their numbers of subbands, and the psyacplan for the N subbands,
+   #which are treated as the nfft/2 uniform subbands of a DFT with nfft=2N.
+   plan=psyacplan(fs,2*N,nfilts)
+   starts=plan.starts
+   sizes=np.diff(np.append(starts,N))
+   return plan.band[:N],starts,sizes,plan
+
+def quantizerSteps(mTbark,plan,quality=1.0):
+   #Step sizes of the Bark bands of all frames from the masking thresholds mTbark (frames x nfilts),
+   #such that the quantization noise power is below the threshold of each subband.
+   #quality: factor for the resolution, larger values give smaller steps and more bits,
+   #about 6 dB less noise for each doubling, see the quality scale at the top
+   #returns sf, the scale factors of the non-empty Bark bands (frames x bands), step=2^(sf/4)
+   #The threshold of a subband is the Bark band threshold scaled down as in mappingfrombarkbatch:
+   invscale=plan.invscale[plan.starts]
+   T=mTbark[:,plan.nonempty]*invscale
+   step=np.sqrt(12.0)*T/quality
+   return np.floor(4.0*np.log2(step)).astype(np.int64)
+
+def quantize(Y,sf,starts,sizes):
+   #Mid-tread quantization of the MDCT frames Y (frames x N) with the steps 2^(sf/4) of the bands
+   #returns q, the integer quantization indices (frames x N)
+   step=np.repeat(2.0**(sf/4.0),sizes,axis=1)
+   return np.round(Y/step).astype(np.int64)
+
+def dequantize(q,sf,sizes):
+   #returns the reconstructed MDCT frames from the quantization indices q and the scale factors sf
+   step=np.repeat(2.0**(sf/4.0),sizes,axis=1)
+   return q*step
+
+def riceParameters(U,starts,sizes):
+   #The Rice parameter k with the fewest bits for each band and frame of the unsigned indices U
+   #(frames x N), or -1 if the band is all zero.
+   #returns kcode=k+1 (frames x bands), 0 for all-zero bands
+   bits=np.empty((maxRiceParameter+1,)+(U.shape[0],len(starts)),dtype=np.int64)
+   for k in range(maxRiceParameter+1):
+      #unary parts, stop bits and k low bits of each symbol:
+      bits[k]=np.add.reduceat(U>>k,starts,axis=1)+sizes*(1+k)
+   kcode=np.argmin(bits,axis=0)+1
+   kcode[np.add.reduceat(U,starts,axis=1)==0]=0
+   return kcode
+
+#Encoder and decoder:
+
+def encode(x,fs,N=1024,fb=None,quality=1.0,nfilts=64,alpha=0.8):
+   #Encodes an audio signal into bytes.
+   #Arguments: x: audio signal between -1 and 1, a 1-dim. array,
+   #or a multichannel signal of shape (# of samples, # of channels), as from AudioIO.wavRead
+   #fs: sampling rate, N: number of MDCT subbands
+   #fb: coefficients of the MDCT filter bank with 1.5*N coefficients, a sine window if None.
+   #The decoder needs the same coefficients.
+   #quality: factor for the step sizes against the masking threshold, larger gives more bits,
+   #1 for noise at the masking threshold, 4 or more for tonal signals (see the top)
+   #nfilts, alpha: number of Bark bands and exponent of the psycho-acoustic model
+   #returns the encoded bytes
+   #the sampling rate is stored as 32 bit integer in the header:
+   if not (np.isscalar(fs) and np.isreal(fs) and fs==int(fs) and 0<fs<2**32):
+      raise ValueError('The sampling rate must be a positive integer, not %r.' % (fs,))
+   fs=int(fs)
+   if fb is None:
+      fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   x=np.asarray(x,dtype=float)
+   numSamples=x.shape[0]
+   channels=1 if x.ndim==1 else x.shape[1]
+   #pad to complete blocks:
+   L=-(-numSamples//N)
+   x=np.concatenate((x,np.zeros((L*N-numSamples,)+x.shape[1:])))*signalScale
+   y=MDCTanafb(x,N,fb,backend='fft')
+   #all frames of all channels in the rows:
+   Y=np.reshape(np.swapaxes(y,-1,-2),(-1,N))
+   band,starts,sizes,plan=bandLayout(fs,N,nfilts)
+   mTbark=maskingThresholdsBark(np.abs(Y),fs,2*N,nfilts,alpha)
+   sf=quantizerSteps(mTbark,psyacplan(fs,2*N,nfilts,alpha),quality)
+   q=quantize(Y,sf,starts,sizes)
+   U=zigzag(q)
+   kcode=riceParameters(U,starts,sizes)
+   coded=kcode>0
+   #side information: Rice parameters as differences along the bands, and scale factors of the
+   #coded bands as differences to the previous coded band:
+   kdiff=zigzag(np.diff(kcode,axis=1,prepend=0))
+   sfc=sf[coded]
+   sfdiff=zigzag(np.diff(sfc,prepend=0))
+   #quantization indices of the coded bands, with the k of their bands:
+   symbolCoded=np.repeat(coded,sizes,axis=1)
+   ksymbols=np.repeat(kcode-1,sizes,axis=1)[symbolCoded]
+   data=[_header.pack(_magic,fs,N,nfilts,channels,numSamples,Y.shape[0]),
+         riceEncode(kdiff,1),riceEncode(sfdiff,2),riceEncode(U[symbolCoded],ksymbols)]
+   return b''.join(data)
+
+def decode(data,fb=None):
+   #Decodes the bytes of encode.
+   #Arguments: data: the encoded bytes, fb: the coefficients of the MDCT filter bank used in encode
+   #returns the decoded signal between -1 and 1, a 1-dim. array or of shape (# of samples, # of channels),
+   #and the sampling rate
+   magic,fs,N,nfilts,channels,numSamples,frames=_header.unpack_from(data,0)
+   if magic!=_magic:
+      raise ValueError('Not an encoded audio stream.')
+   if fb is None:
+      fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   band,starts,sizes,plan=bandLayout(fs,N,nfilts)
+   offset=_header.size
+   kdiff,offset=riceDecode(data,offset,1)
+   kcode=np.cumsum(unzigzag(kdiff).reshape(frames,len(starts)),axis=1)
+   coded=kcode>0
+   sfdiff,offset=riceDecode(data,offset,2)
+   sf=np.zeros(kcode.shape,dtype=np.int64)
+   sf[coded]=np.cumsum(unzigzag(sfdiff))
+   symbolCoded=np.repeat(coded,sizes,axis=1)
+   ksymbols=np.repeat(kcode-1,sizes,axis=1)[symbolCoded]
+   U,offset=riceDecode(data,offset,ksymbols)
+   q=np.zeros((frames,N),dtype=np.int64)
+   q[symbolCoded]=unzigzag(U)
+   Y=dequantize(q,sf,sizes)
+   y=np.swapaxes(np.reshape(Y,(channels,-1,N)),-1,-2)
+   if channels==1:
+      y=y[0]
+   xr=MDCTsynfb(y,fb,backend='fft')/signalScale
+   #the MDCT filter bank has a delay of N samples:
+   return xr[N:(N+numSamples)],fs
+
+#The names of encode and decode in the package namespace:
+perceptualEncode=encode
+perceptualDecode=decode
+
+#Testing:
+if __name__ == '__main__':
+   import time
+   #Rice coding of random numbers with random parameters:
+   u=np.random.geometric(0.1,10000)-1
+   k=np.random.randint(0,6,10000)
+   v,offset=riceDecode(riceEncode(u,k),0,k)
+   print("Rice coding identical:", np.array_equal(u,v))
+   #Test signal: tones and noise, 10 s stereo:
+   fs=44100
+   t=np.arange(10*fs)/float(fs)
+   x=np.stack((0.3*np.sin(2*np.pi*440*t)+0.1*np.sin(2*np.pi*3000*t)+0.01*np.random.randn(len(t)),
+               0.2*np.sin(2*np.pi*660*t)*np.sin(2*np.pi*0.5*t)+0.02*np.random.randn(len(t))),axis=1)
+   start=time.time()
+   data=encode(x,fs)
+   tenc=time.time()-start
+   start=time.time()
+   xr,fsr=decode(data)
+   tdec=time.time()-start
+   print("Encoding: %.3f s, decoding: %.3f s for %.1f s of audio" % (tenc,tdec,len(x)/float(fs)))
+   print("Bit rate: %.1f kbit/s" % (8*len(data)/(len(x)/float(fs))/1000))
+   print("SNR: %.1f dB" % (10*np.log10(np.sum(x**2)/np.sum((xr-x)**2))))
+   #Without quantization noise, the decoder reconstructs the encoder input (up to the quantization):
+   data=encode(x,fs,quality=1e6)
+   xr,fsr=decode(data)
+   print("Max. error with very small steps:", np.max(np.abs(xr-x)))
+   #The quality scale with a pure 700 Hz tone, about 6 dB more SNR for each doubling of quality:
+   x=0.5*np.sin(2*np.pi*700*t[:5*fs])
+   snrs=[]
+   for quality in (1,2,4,8):
+      data=encode(x,fs,quality=quality)
+      xr,fsr=decode(data)
+      snrs.append(10*np.log10(np.sum(x**2)/np.sum((xr-x)**2)))
+      print("700 Hz tone, quality %d: SNR %.1f dB, %.1f kbit/s" %
+            (quality,snrs[-1],8*len(data)/(len(x)/float(fs))/1000))
+   if not (snrs[0]>14 and snrs[2]>24 and np.all(np.diff(snrs)>3)):
+      raise AssertionError("quality scale of the tone: %s dB" % snrs)
+   #The sampling rate is an integer, also if given as float:
+   print("Float sampling rate:", decode(encode(x[:4096],44100.0))[1])
+   try:
+      encode(x[:4096],44100.5)
+      raise AssertionError("a fractional sampling rate was accepted")
+   except ValueError as e:
+      print("Fractional sampling rate:", e)
@@ -0,0 +1,112 @@
+#Primitives of the filter banks with polynomial matrices, as used in the lecture and in MDCTfb.py.
+#A polyphase signal or a polynomial matrix is a 3-d array, whose last dimension is the exponent
+#of z^-1, e.g. a polyphase signal of shape (1,N,# of blocks), or a matrix of shape (N,N,degree+1).
+#float32 arrays are computed in float32, everything else in float64.
+#Gerald Schuller, August 2017.
+
+import numpy as np
+
+def DCT4(samples):
+   #Argument: 3-d array of samples, of shape (y,N,# of blocks), the DCT4 is applied to the
+   #second dimension of each block
+   #returns a 3-d array of shape (1,N,# of blocks) with the orthonormal DCT4 of each block
+   import scipy.fftpack as spfft
+   #use a DCT3 to implement a DCT4:
+   r,N,blocks=samples.shape
+   samplesup=np.zeros((1,2*N,blocks),np.float32 if samples.dtype==np.float32 else np.float64)
+   #upsample signal:
+   samplesup[0,1::2,:]=samples
+   y=spfft.dct(samplesup,type=3,axis=1,norm='ortho')
+   y*=np.sqrt(2)
+   return y[:,0:N,:]
+
+def Dmatrix(N):
+   #returns the delay polynomial matrix D(z) of shape (N,N,2), which delays the first half
+   #of each block by one block
+   D=np.zeros((N,N,2))
+   D[:,:,0]=np.diag(np.append(np.zeros(N//2),np.ones(N//2)))
+   D[:,:,1]=np.diag(np.append(np.ones(N//2),np.zeros(N//2)))
+   return D
+
+def Dinvmatrix(N):
+   #returns the inverse delay matrix of D(z) (up to a delay of one block), of shape (N,N,2),
+   #which delays the second half of each block
+   D=np.zeros((N,N,2))
+   D[:,:,0]=np.diag(np.append(np.ones(N//2),np.zeros(N//2)))
+   D[:,:,1]=np.diag(np.append(np.zeros(N//2),np.ones(N//2)))
+   return D
+
+def symFmatrix(f):
+   #Argument: f: 1.5*N coefficients of the MDCT filter bank
+   #returns the diamond shaped folding matrix F of shape (N,N,1), with the coefficients of the
+   #lower right quarter computed from the others such that F has a determinant of +-1
+   sym=1.0
+   N=int(len(f)/1.5)
+   F=np.zeros((N,N))
+   F[0:(N//2),0:(N//2)]=np.fliplr(np.diag(f[0:(N//2)]))
+   F[(N//2):N,0:(N//2)]=np.diag(f[(N//2):N])
+   F[0:(N//2),(N//2):N]=np.diag(f[N:(N+N//2)])
+   ff=np.flipud((sym*np.ones(N//2)-f[N:int(1.5*N)]*np.flipud(f[(N//2):N]))/f[0:(N//2)])
+   F[(N//2):N,(N//2):N]=-np.fliplr(np.diag(ff))
+   return np.expand_dims(F,axis=-1)
+
+def symFinvmatrix(f):
+   #Argument: f: 1.5*N coefficients of the MDCT filter bank, as for symFmatrix
+   #returns the inverse of symFmatrix(f) of shape (N,N,1), in closed form from the
+   #inverses of its 2x2 sub matrices, which couple the rows N/2-1-j, N/2+j and columns j, N-1-j
+   F=symFmatrix(f)[:,:,0]
+   N=F.shape[0]
+   j=np.arange(N//2)
+   ra=N//2-1-j
+   rb=N//2+j
+   ca=j
+   cb=N-1-j
+   a,b,c,d=F[ra,ca],F[ra,cb],F[rb,ca],F[rb,cb]
+   det=a*d-b*c
+   Finv=np.zeros((N,N))
+   Finv[ca,ra]=d/det
+   Finv[ca,rb]=-b/det
+   Finv[cb,ra]=-c/det
+   Finv[cb,rb]=a/det
+   return np.expand_dims(Finv,axis=-1)
+
+def polmatmult(A,B):
+   #Multiplies two polynomial matrices (or a polyphase signal and a matrix) A and B,
+   #of shapes (NAx,NAy,degree+1) and (NBx,NBy,degree+1)
+   #returns C, of shape (NAx,NBy,degree of A + degree of B + 1)
+   [NAx,NAy,NAz]=np.shape(A)
+   [NBx,NBy,NBz]=np.shape(B)
+   Deg=NAz+NBz-1
+   C=np.zeros((NAx,NBy,Deg),np.result_type(A,B,np.float32))
+   for n in range(0,Deg):
+      for m in range(0,n+1):
+         if ((n-m)<NAz and m<NBz):
+            C[:,:,n]=C[:,:,n]+np.dot(A[:,:,(n-m)],B[:,:,m])
+   return C
+
+def x2polyphase(x,N,dtype=np.float64):
+   #Converts the signal x into a polyphase signal of shape (1,N,# of blocks) of type dtype, with
+   #the blocks of N samples in the columns, incomplete blocks at the end are dropped
+   L=len(x)//N
+   return np.expand_dims(np.reshape(np.asarray(x,dtype=dtype)[:(L*N)],(L,N)).T,axis=0)
+
+def polyphase2x(xp):
+   #Converts a polyphase signal of shape (1,N,# of blocks) back into a 1-d signal, of type float32
+   #for float32 signals, float64 otherwise
+   return np.reshape(xp[0].T,-1).astype(np.result_type(xp.dtype,np.float32))
+
+
+#Testing:
+if __name__ == '__main__':
+   N=8
+   f=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   F=symFmatrix(f)
+   print("F*Finv error:", np.max(np.abs(np.dot(F[:,:,0],symFinvmatrix(f)[:,:,0])-np.eye(N))))
+   #D(z)*Dinv(z) is a delay of one block:
+   DDinv=polmatmult(Dmatrix(N),Dinvmatrix(N))
+   print("D*Dinv:", [np.array_equal(DDinv[:,:,k],np.eye(N)*(k==1)) for k in range(3)])
+   x=np.random.randn(10*N+3)
+   print("Polyphase roundtrip:", np.array_equal(polyphase2x(x2polyphase(x,N)),x[:10*N]))
+   #DCT4 is orthonormal and its own inverse:
+   y=np.random.randn(1,N,5)
+   print("DCT4 inverse error:", np.max(np.abs(DCT4(DCT4(y))-y)))
@@ -0,0 +1,219 @@
+#Opt-in profiling of the stages inside the MDCT filter bank and the audio I/O.
+#The stages (e.g. x2polyphase, polmatmult, DCT4, and the steps of AudioIO.wavRead) are called
+#through profiled(name,func,*args). Without an active Profiler this only checks a global and calls
+#the function, so it costs nothing measurable against the array operations of a stage. With
+#   with Profiler(memory=True) as prof:
+#      y=MDCTanafb(x,N,fb)
+#   print(prof.summary())
+#   prof.toChromeTrace('trace.json')
+#each call of a stage is recorded with its wall time, the bytes of its array arguments (of its
+#returned arrays for stages without array arguments, e.g. which read from a file), and,
+#with memory=True, the peak of the memory allocated in the stage (via tracemalloc, which slows
+#down the computation). tracemalloc measures the memory of the whole process, hence the peak is
+#only measured for stages which run while no other thread is in a stage, and None for the stages
+#of threads which run at the same time, e.g. of MDCTanafbparallel. A Profiler can be entered
+#several times, e.g. for every file of a batch run, its records accumulate. The records of several
+#profilers, e.g. of several processes, are combined with aggregateRecords. Chrome traces are shown with chrome://tracing or Perfetto.
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+#The active profiler, None if profiling is disabled:
+_active=None
+
+def profiled(name,func,*args,**kwargs):
+   #Calls func(*args,**kwargs) as the stage name, and records it if a Profiler is active.
+   if _active is None:
+      return func(*args,**kwargs)
+   return _active.call(name,func,args,kwargs)
+
+def argBytes(args):
+   #returns the number of bytes of the arrays and byte strings in args
+   n=0
+   for a in args:
+      if isinstance(a,np.ndarray):
+         n+=a.nbytes
+      elif isinstance(a,(bytes,bytearray,memoryview)):
+         n+=len(a)
+   return n
+
+def aggregateRecords(records):
+   #Aggregates records of stage calls, e.g. Profiler.records of several runs or processes.
+   #returns a dict with the stage names as keys, and a dict with the number of calls, the total,
+   #mean and maximum time in seconds, the total bytes and the maximum peak memory in bytes
+   #(None if it was not measured) for each stage
+   summary={}
+   for r in records:
+      s=summary.setdefault(r['name'],{'calls':0,'total':0.0,'max':0.0,'bytes':0,'peak':None})
+      s['calls']+=1
+      s['total']+=r['duration']
+      s['max']=max(s['max'],r['duration'])
+      s['bytes']+=r['bytes']
+      if r['peak'] is not None:
+         s['peak']=max(s['peak'] or 0,r['peak'])
+   for s in summary.values():
+      s['mean']=s['total']/s['calls']
+   return summary
+
+class Profiler:
+   #Context manager which records the calls of the stages while it is active.
+   #Arguments: memory: if True, the peak allocation of each stage is measured with tracemalloc
+   #The records are a list of dicts with the stage name, the start time and the duration in
+   #seconds, the bytes of the arguments (or of the results), the peak allocation in bytes (None without
+   #memory, or if stages of other threads ran at the same time), the thread and the nesting depth of
+   #the stage.
+   def __init__(self,memory=False):
+      self.memory=memory
+      self.records=[]
+      self.lock=threading.Lock()
+      self.local=threading.local()
+      self.origin=time.perf_counter()
+      self.previous=None
+      self.startedTracing=False
+      #number of threads in a stage, and the number of times a thread entered a stage while
+      #another one was in a stage, which spoils the process wide peaks of tracemalloc:
+      self.running=0
+      self.overlaps=0
+
+   def __enter__(self):
+      global _active
+      self.previous=_active
+      _active=self
+      if self.memory and not tracemalloc.is_tracing():
+         tracemalloc.start()
+         self.startedTracing=True
+      return self
+
+   def __exit__(self,*exc):
+      global _active
+      _active=self.previous
+      if self.startedTracing:
+         tracemalloc.stop()
+         self.startedTracing=False
+      return False
+
+   def call(self,name,func,args,kwargs):
+      #Calls and records one stage. Nested stages are kept on a stack per thread, such that
+      #the peak of an inner stage is also counted for the outer stage.
+      stack=getattr(self.local,'stack',None)
+      if stack is None:
+         stack=self.local.stack=[]
+      memory=self.memory and tracemalloc.is_tracing()
+      with self.lock:
+         if not stack:
+            self.running+=1
+            if self.running>1:
+               self.overlaps+=1
+         overlaps=self.overlaps
+      if memory:
+         base,peak=tracemalloc.get_traced_memory()
+         if stack:
+            stack[-1]['innerPeak']=max(stack[-1]['innerPeak'],peak)
+         tracemalloc.reset_peak()
+      frame={'base':base if memory else 0,'innerPeak':0,'overlaps':overlaps}
+      stack.append(frame)
+      result=None
+      start=time.perf_counter()
+      try:
+         result=func(*args,**kwargs)
+         return result
+      finally:
+         duration=time.perf_counter()-start
+         stack.pop()
+         peak=None
+         if memory:
+            current,peak=tracemalloc.get_traced_memory()
+            peak=max(peak,frame['innerPeak'])
+            if stack:
+               stack[-1]['innerPeak']=max(stack[-1]['innerPeak'],peak)
+            peak-=frame['base']
+         with self.lock:
+            #another thread entered a stage during this one:
+            if self.running>1 or self.overlaps!=frame['overlaps']:
+               peak=None
+            if not stack:
+               self.running-=1
+         #the bytes of the arrays which are processed, the results of stages which read a file:
+         nbytes=argBytes(args) or argBytes(result if isinstance(result,tuple) else (result,))
+         record={'name':name,'start':start-self.origin,'duration':duration,
+                 'bytes':nbytes,'peak':peak,'thread':threading.get_ident(),'depth':len(stack)}
+         with self.lock:
+            self.records.append(record)
+
+   def clear(self):
+      #Removes all records
+      with self.lock:
+         self.records=[]
+
+   def summary(self):
+      #returns the records aggregated per stage, see aggregateRecords
+      return aggregateRecords(self.records)
+
+   def toJSON(self,fileName=None):
+      #returns the records and their summary as JSON string, and writes it into fileName if given
+      s=json.dumps({'records':self.records,'summary':self.summary()},indent=1,sort_keys=True)
+      if fileName is not None:
+         with open(fileName,'w') as f:
+            f.write(s)
+      return s
+
+   def toChromeTrace(self,fileName=None):
+      #returns the records in the Chrome trace event format as JSON string, and writes it into
+      #fileName if given. Each stage call is a complete event, with times in microseconds.
+      events=[{'name':r['name'],'ph':'X','ts':r['start']*1e6,'dur':r['duration']*1e6,
+               'pid':os.getpid(),'tid':r['thread'],'args':{'bytes':r['bytes'],'peak':r['peak']}}
+              for r in self.records]
+      s=json.dumps({'traceEvents':events,'displayTimeUnit':'ms'})
+      if fileName is not None:
+         with open(fileName,'w') as f:
+            f.write(s)
+      return s
+
+
+#Testing:
+if __name__ == '__main__':
+   import tempfile
+   #the hooks in the other modules use the imported module, not this script as __main__:
+   from audiocoding.profiling import Profiler, profiled
+   from .MDCTfb import MDCTanafb, MDCTsynfb
+   from .IOMethods import AudioIO
+   N=1024
+   fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   x=np.random.uniform(-1,1,(44100*5,2))
+   #Overhead of the disabled hooks:
+   start=time.perf_counter()
+   for i in range(100000):
+      profiled('noop',len,())
+   print("Disabled hook: %.3f us per stage call" % ((time.perf_counter()-start)*10))
+   fileName=os.path.join(tempfile.mkdtemp(),'test.wav')
+   AudioIO.wavWrite(x,44100,24,fileName)
+   with Profiler(memory=True) as prof:
+      for backend in ('polmat','fft'):
+         y=MDCTanafb(x,N,fb,backend)
+         xr=MDCTsynfb(y,fb,backend)
+      xw,fs=AudioIO.wavRead(fileName,mono=True)
+   for name,s in sorted(prof.summary().items()):
+      print("%-22s %3d calls %9.4f s %10.1f MB data, peak %8.1f MB" %
+            (name,s['calls'],s['total'],s['bytes']/1e6,(s['peak'] or 0)/1e6))
+   trace=json.loads(prof.toChromeTrace())
+   assert len(trace['traceEvents'])==len(prof.records)
+   #disabled again after the with statement:
+   assert profiled('noop',len,())==0 and len(prof.records)==len(trace['traceEvents'])
+   #Stages of threads which run at the same time have no peak, those of one thread alone have:
+   barrier=threading.Barrier(2)
+   with Profiler(memory=True) as prof:
+      profiled('alone',np.ones,100000)
+      threads=[threading.Thread(target=profiled,args=('together',barrier.wait)) for i in range(2)]
+      for t in threads:
+         t.start()
+      for t in threads:
+         t.join()
+   alone=[r['peak'] for r in prof.records if r['name']=='alone']
+   together=[r['peak'] for r in prof.records if r['name']=='together']
+   print("Peaks of a stage alone and of threads at the same time:", alone, together)
+   if alone[0] is None or alone[0]<800000 or together!=[None,None]:
+      raise AssertionError("wrong peaks of concurrent stages")
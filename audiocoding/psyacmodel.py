@@ -0,0 +1,267 @@
+#Programs to implement a psycho-acoustic model
+#Using a matrix for the spreading function (faster)
+#Gerald Schuller, Nov. 2016
+#The functions from the notebook AC_05_psychoAcousticsModels compute the masking threshold of
+#one spectrum at a time. maskingThresholds computes it for all frames of a spectrogram at once,
+#with the Bark bands, spreading matrix and threshold in quiet precomputed in a cached plan.
+
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+def hz2bark(f):
+    """ Usage: Bark=hz2bark(f)
+    f    : (ndarray)    Array containing frequencies in Hz.
+    Returns  :
+    Brk  : (ndarray)    Array containing Bark scaled values.
+    """
+    Brk = 6. * np.arcsinh(f/600.)
+    return Brk
+
+def bark2hz(Brk):
+    """ Usage:
+    Hz=bark2hs(Brk)
+    Args     :
+        Brk  : (ndarray)    Array containing Bark scaled values.
+    Returns  :
+        Fhz  : (ndarray)    Array containing frequencies in Hz.
+    """
+    Fhz = 600. * np.sinh(Brk/6.)
+    return Fhz
+
+def f_SP_dB(maxfreq,nfilts):
+    #usage: spreadingfunctionmatdB=f_SP_dB(maxfreq,nfilts)
+    #computes the spreading function protoype, in the Bark scale.
+    #Arguments: maxfreq: half the sampling freqency
+    #nfilts: Number of subbands in the Bark domain, for instance 64
+    maxbark=hz2bark(maxfreq) #upper end of our Bark scale:22 Bark at 16 kHz
+    #Number of our Bark scale bands over this range: nfilts=64
+    spreadingfunctionBarkdB=np.zeros(2*nfilts)
+    #Spreading function prototype, "nfilts" bands for lower slope
+    spreadingfunctionBarkdB[0:nfilts]=np.linspace(-maxbark*27,-8,nfilts)-23.5
+    #"nfilts" bands for upper slope:
+    spreadingfunctionBarkdB[nfilts:2*nfilts]=np.linspace(0,-maxbark*12.0,nfilts)-23.5
+    return spreadingfunctionBarkdB
+
+def spreadingfunctionmat(spreadingfunctionBarkdB,alpha,nfilts):
+    #Turns the spreading prototype function into a matrix of shifted versions.
+    #Convert from dB to "voltage" and include alpha exponent
+    #nfilts: Number of subbands in the Bark domain, for instance 64
+    spreadingfunctionBarkVoltage=10.0**(spreadingfunctionBarkdB/20.0*alpha)
+    #Spreading functions for all bark scale bands in a matrix:
+    spreadingfuncmatrix=np.zeros((nfilts,nfilts))
+    for k in range(nfilts):
+        spreadingfuncmatrix[k,:]=spreadingfunctionBarkVoltage[(nfilts-k):(2*nfilts-k)]
+    return spreadingfuncmatrix
+
+def LTQbark(fs,nfilts):
+    #Threshold in quiet in the nfilts Bark subbands, as "voltage" in our internal representation
+    maxfreq=fs/2.0
+    maxbark=hz2bark(maxfreq)
+    step_bark = maxbark/(nfilts-1)
+    barks=np.arange(0,nfilts)*step_bark
+    #convert the bark subband frequencies to Hz:
+    f=bark2hz(barks)+1e-6
+    #Threshold of quiet in the Bark subbands in dB:
+    LTQ=np.clip((3.64*(f/1000.)**-0.8 -6.5*np.exp(-0.6*(f/1000.-3.3)**2.)+1e-3*((f/1000.)**4.)),-20,160)
+    return 10.0**((LTQ-60)/20)
+
+def LTQlinear(fs,nfft):
+    #Threshold in quiet in the nfft/2+1 uniform subbands up to Nyquist, as "voltage" in our internal representation
+    f=np.linspace(0,fs/2,nfft//2+1)
+    with np.errstate(divide='ignore'):
+        LTQ=np.clip((3.64*(f/1000.)**-0.8 -6.5*np.exp(-0.6*(f/1000.-3.3)**2.)+1e-3*((f/1000.)**4.)),-20,80)
+    return 10.0**((LTQ-60)/20)
+
+def maskingThresholdBark(mXbark,spreadingfuncmatrix,alpha,fs,nfilts):
+    #Computes the masking threshold on the Bark scale with non-linear superposition
+    #usage: mTbark=maskingThresholdBark(mXbark,spreadingfuncmatrix,alpha)
+    #Arg: mXbark: magnitude of FFT spectrum, on the Bark scale
+    #spreadingfuncmatrix: spreading function matrix from function spreadingfunctionmat
+    #alpha: exponent for non-linear superposition (eg. 0.6),
+    #fs: sampling freq., nfilts: number of Bark subbands
+    #nfilts: Number of subbands in the Bark domain, for instance 64
+    #Returns: mTbark: the resulting Masking Threshold on the Bark scale
+
+    #Compute the non-linear superposition:
+    mTbark=np.dot(mXbark**alpha, spreadingfuncmatrix**alpha)
+    #apply the inverse exponent to the result:
+    mTbark=mTbark**(1.0/alpha)
+    #Maximum of spreading functions and hearing threshold in quiet:
+    mTbark=np.max((mTbark, LTQbark(fs,nfilts)),0)
+    return mTbark
+
+def mapping2barkmat(fs, nfilts,nfft):
+    #Constructing matrix W which has 1's for each Bark subband, and 0's else:
+    #nfft=2048; nfilts=64;
+    maxbark=hz2bark(fs/2) #upper end of our Bark scale:22 Bark at 16 kHz
+    step_barks = maxbark/(nfilts-1)
+    #the linspace produces an array with the fft band edges:
+    binbarks = hz2bark(np.linspace(0,(nfft//2),(nfft//2)+1)*fs//nfft)
+    W = np.zeros((nfilts, nfft))
+    for i in range(nfilts):
+        W[i,0:(nfft//2)+1] = (np.round(binbarks/step_barks)== i)
+    return W
+
+def mapping2bark(mX,W,nfft):
+    #Maps (warps) magnitude spectrum vector mX from DFT to the Bark scale
+    #arguments: mX: magnitude spectrum from fft
+    #W: mapping matrix from function mapping2barkmat
+    #nfft: : number of subbands in fft
+    #returns: mXbark, magnitude mapped to the Bark scale
+    nfreqs=int(nfft/2)
+    #Here is the actual mapping, suming up powers and conv. back to Voltages:
+    mXbark = (np.dot( np.abs(mX[:nfreqs])**2.0, W[:, :nfreqs].T))**(0.5)
+    return mXbark
+
+def mappingfrombarkmat(W,nfft):
+    #Constructing inverse mapping matrix W_inv from matrix W for mapping back from bark scale
+    #usuage: W_inv=mappingfrombarkmat(Wnfft)
+    #argument: W: mapping matrix from function mapping2barkmat
+    #nfft: : number of subbands in fft
+    nfreqs=int(nfft/2)
+    W_inv= np.dot(np.diag((1.0/np.sum(W,1))**0.5), W[:,0:nfreqs + 1]).T
+    return W_inv
+
+def mappingfrombark(mTbark,W_inv,nfft):
+    #usage: mT=mappingfrombark(mTbark,W_inv,nfft)
+    #Maps (warps) magnitude spectrum vector mTbark in the Bark scale
+    # back to the linear scale
+    #arguments:
+    #mTbark: masking threshold in the Bark domain
+    #W_inv : inverse mapping matrix W_inv from matrix W for mapping back from bark scale
+    #nfft: : number of subbands in fft
+    #returns: mT, masking threshold in the linear scale
+    nfreqs=int(nfft/2)
+    mT = np.dot(mTbark, W_inv[:, :nfreqs].T)
+    return mT
+
+def maskingThreshold(mX, W, W_inv,fs,spreadingfuncmatrix,alpha,nfft):
+    #Input: magnitude spectrum of a DFT of size nfft
+    #Returns: masking threshold (as voltage) for its first nfft/2+1 subbands
+    nfilts=W.shape[0]
+    #Map magnitude spectrum to 1/3 Bark bands:
+    mXbark=mapping2bark(mX,W, nfft)
+    #Compute the masking threshold in the Bark domain:
+    mTbark=maskingThresholdBark(mXbark,spreadingfuncmatrix,alpha,fs,nfilts)
+    #Map back from the Bark domain,
+    #Result is the masking threshold in the linear domain:
+    mT=mappingfrombark(mTbark,W_inv,nfft)
+    #Threshold in quiet:
+    mT=np.max((mT, LTQlinear(fs,nfft)),0)
+    return mT
+
+#Batched masking threshold for all frames of a spectrogram:
+
+#Precomputed model for one (fs, nfft, nfilts, alpha):
+#band: Bark subband of each of the nfft/2+1 uniform subbands, starts: first uniform subband of
+#each non-empty Bark subband, nonempty: mask of the non-empty Bark subbands, invscale: normalization
+#of mappingfrombarkmat for each uniform subband, spreadingalpha: spreading matrix to the power alpha,
+#ltqbark, ltqlinear: thresholds in quiet in the Bark and the uniform subbands.
+Psyacplan=namedtuple('Psyacplan', ['fs','nfft','nfilts','alpha','band','starts','nonempty',
+                                   'invscale','spreadingalpha','ltqbark','ltqlinear'])
+
+@lru_cache(maxsize=32)
+def psyacplan(fs,nfft,nfilts=64,alpha=0.8):
+    #returns the cached Psyacplan for the sampling rate fs, nfft subbands of the DFT,
+    #nfilts Bark subbands and the exponent alpha.
+    #Instead of the nfilts x nfft matrix W of mapping2barkmat, only the Bark subband of each
+    #uniform subband is stored: the Bark subbands are contiguous ranges of uniform subbands.
+    nfreqs=nfft//2
+    maxbark=hz2bark(fs/2)
+    step_barks = maxbark/(nfilts-1)
+    binbarks = hz2bark(np.linspace(0,(nfft//2),(nfft//2)+1)*fs//nfft)
+    band=np.round(binbarks/step_barks).astype(int)
+    #number of uniform subbands in each Bark subband, including the Nyquist subband as in W:
+    counts=np.bincount(band,minlength=nfilts)[:nfilts]
+    #the mapping to the Bark scale leaves out the Nyquist subband, as mapping2bark:
+    nonempty=np.bincount(band[:nfreqs],minlength=nfilts)[:nfilts]>0
+    starts=np.searchsorted(band[:nfreqs],np.arange(nfilts)[nonempty])
+    with np.errstate(divide='ignore'):
+        invscale=((1.0/counts)**0.5)[band]
+    spreadingalpha=spreadingfunctionmat(f_SP_dB(fs/2,nfilts),alpha,nfilts)**alpha
+    plan=Psyacplan(fs,nfft,nfilts,alpha,band,starts,nonempty,invscale,spreadingalpha,
+                   LTQbark(fs,nfilts),LTQlinear(fs,nfft))
+    for a in plan[4:]:
+        a.setflags(write=False)
+    return plan
+
+def mapping2barkbatch(mX,plan):
+    #Maps the magnitude spectra of all frames in mX (frames x subbands, at least nfft/2 subbands)
+    #to the Bark scale, like mapping2bark for each frame, with sums over the Bark subband ranges.
+    #returns: mXbark, of shape (frames x nfilts), in the precision of mX
+    nfreqs=plan.nfft//2
+    power=np.abs(mX[...,:nfreqs])**2.0
+    mXbark=np.zeros(power.shape[:-1]+(plan.nfilts,),power.dtype)
+    mXbark[...,plan.nonempty]=np.add.reduceat(power,plan.starts,axis=-1)
+    return mXbark**0.5
+
+def mappingfrombarkbatch(mTbark,plan):
+    #Maps the thresholds of all frames in mTbark (frames x nfilts) back to the linear scale,
+    #like mappingfrombark for each frame, by indexing instead of a matrix multiplication.
+    #returns: mT, of shape (frames x nfft/2+1), in the precision of mTbark
+    return mTbark[...,plan.band]*plan.invscale.astype(mTbark.dtype,copy=False)
+
+def maskingThresholdsBark(mX,fs,nfft,nfilts=64,alpha=0.8,dtype=np.float64):
+    #Computes the masking thresholds on the Bark scale of all frames of a spectrogram at once,
+    #the same as maskingThresholdBark of mapping2bark for each frame.
+    #Arguments: as for maskingThresholds
+    #Returns: mTbark, masking thresholds (as voltage) of shape (frames x nfilts), of type dtype
+    plan=psyacplan(fs,nfft,nfilts,alpha)
+    mX=np.asarray(mX)
+    if np.iscomplexobj(mX):
+        mX=mX.astype(np.result_type(dtype,np.complex64),copy=False)
+    else:
+        mX=mX.astype(dtype,copy=False)
+    mXbark=mapping2barkbatch(mX,plan)
+    #non-linear superposition of the spreading functions:
+    mTbark=np.dot(mXbark**alpha, plan.spreadingalpha.astype(dtype,copy=False))**(1.0/alpha)
+    return np.maximum(mTbark,plan.ltqbark.astype(dtype,copy=False))
+
+def maskingThresholds(mX,fs,nfft,nfilts=64,alpha=0.8,dtype=np.float64):
+    #Computes the masking thresholds of all frames of a spectrogram at once,
+    #the same as maskingThreshold for each frame.
+    #Arguments: mX: magnitude spectra of the frames (frames x subbands), e.g. from np.fft.rfft
+    #of blocks of length nfft, at least nfft/2 subbands
+    #fs: sampling frequency, nfft: length of the DFT, nfilts: number of Bark subbands
+    #alpha: exponent for the non-linear superposition
+    #dtype: np.float64, or np.float32 to compute the thresholds in single precision.
+    #The float32 thresholds differ from the float64 ones by less than 1e-5 relative,
+    #i.e. less than 1e-4 dB.
+    #Returns: mT, masking thresholds (as voltage) of shape (frames x nfft/2+1), of type dtype
+    plan=psyacplan(fs,nfft,nfilts,alpha)
+    mTbark=maskingThresholdsBark(mX,fs,nfft,nfilts,alpha,dtype)
+    mT=mappingfrombarkbatch(mTbark,plan)
+    return np.maximum(mT,plan.ltqlinear.astype(dtype,copy=False))
+
+
+#Testing:
+if __name__ == '__main__':
+    import time
+    fs=32000  # sampling frequency of audio signal
+    alpha=0.8  #Exponent for non-linear superposition of spreading functions
+    nfilts=64  #number of subbands in the bark domain
+    nfft=2048  #number of fft subbands
+    x=np.random.randn(32000*10)*1000
+    #Spectrogram of non-overlapping blocks:
+    blocks=np.reshape(x[:(len(x)//nfft*nfft)],(-1,nfft))
+    mX=np.abs(np.fft.rfft(blocks,norm='ortho'))
+    #Reference, one frame at a time:
+    t=time.time()
+    W=mapping2barkmat(fs,nfilts,nfft)
+    W_inv=mappingfrombarkmat(W,nfft)
+    spreadingfuncmatrix=spreadingfunctionmat(f_SP_dB(fs/2,nfilts),alpha,nfilts)
+    mTref=np.array([maskingThreshold(m,W,W_inv,fs,spreadingfuncmatrix,alpha,nfft) for m in mX])
+    print("Per frame:", time.time()-t, "s")
+    t=time.time()
+    mT=maskingThresholds(mX,fs,nfft,nfilts,alpha)
+    print("All frames at once:", time.time()-t, "s")
+    print("Max. relative difference:", np.max(np.abs(mT-mTref)/mTref))
+    #float32 precision, checked against the error bound of maskingThresholds:
+    t=time.time()
+    mT32=maskingThresholds(mX,fs,nfft,nfilts,alpha,dtype=np.float32)
+    print("All frames at once, float32:", time.time()-t, "s")
+    err=np.max(np.abs(mT32-mT)/mT)
+    print("float32 max. relative difference:", err)
+    if mT32.dtype!=np.float32 or err>=1e-5:
+        raise AssertionError("float32 masking thresholds out of the error bound")
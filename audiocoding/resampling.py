@@ -0,0 +1,176 @@
+#Sampling rate conversion by a rational factor L/M with a polyphase filter, e.g. to bring 44.1, 48
+#and 96 kHz material to a common rate before the MDCT:
+#   y=resample(x,44100,48000)
+#The conversion is upsampling by L (inserting L-1 zeros), lowpass filtering with h, and
+#downsampling by M, as in the notebook AC_01_Basics_Multirate. Here only the kept output samples
+#are computed, and the inserted zeros are not multiplied: output sample n is
+#y(n)=sum_m h(p+m*L)*x(i-m), with the phase p=(n*M+D) mod L and i=(n*M+D)//L, where D is the delay
+#of the linear phase filter, which is compensated. Outputs with the same phase are every L-th
+#output, their input windows are every M-th window of the signal, hence each phase is one
+#product of a strided window view with its polyphase filter, for all channels at once.
+#The Resampler object converts a stream block by block, e.g. from AudioIO.wavBlocks, with the
+#same result as resample for the whole signal, for blocks of any length. For the same input and
+#output sampling rate, the signal is passed through unchanged.
+
+import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+
+#Quality settings of the lowpass filter: number of zero crossings on each side of the windowed
+#sinc, beta of its Kaiser window, and cutoff frequency relative to the lower Nyquist frequency
+resamplingQualities={'low':(8,5.0,0.85),'medium':(16,7.0,0.92),'high':(32,9.0,0.95)}
+
+def resamplingFactors(fsIn,fsOut):
+   #returns the factors L and M without common divisor, with fsOut/fsIn=L/M
+   f=Fraction(int(fsOut),int(fsIn))
+   return f.numerator,f.denominator
+
+@lru_cache(maxsize=32)
+def resamplingFilter(L,M,quality='high'):
+   #Designs the Kaiser windowed sinc lowpass filter for upsampling by L and downsampling by M,
+   #with the gain L, and splits it into L polyphase filters.
+   #returns the read-only polyphase filters H of shape (L,K), with H[p]=h[p+m*L] in reverse order
+   #(for the windows of K samples in increasing time), and the delay D of h in samples
+   #at the upsampled rate.
+   zeros,beta,rolloff=resamplingQualities[quality]
+   D=zeros*max(L,M)
+   #cutoff frequency, normalized to the upsampled sampling rate:
+   fc=rolloff*0.5/max(L,M)
+   n=np.arange(-D,D+1)
+   h=L*2*fc*np.sinc(2*fc*n)*np.kaiser(2*D+1,beta)
+   K=-(-len(h)//L)
+   hp=np.zeros(K*L)
+   hp[:len(h)]=h
+   H=np.ascontiguousarray(np.reshape(hp,(K,L)).T[:,::-1])
+   H.setflags(write=False)
+   return H,D
+
+class Resampler:
+   #Stateful resampler for streams, e.g. blocks of AudioIO.wavBlocks.
+   #Arguments: fsIn, fsOut: input and output sampling rates (integers, e.g. 44100 and 48000)
+   #quality: 'low', 'medium' or 'high', see resamplingQualities
+   #Each call of process returns the output samples which are complete with the input so far,
+   #flush returns the rest, such that the concatenated output equals resample for the whole signal.
+   #Blocks are 1-d, or 2-d of shape (# of samples, # of channels).
+   def __init__(self,fsIn,fsOut,quality='high'):
+      self.L,self.M=resamplingFactors(fsIn,fsOut)
+      self.H,self.D=resamplingFilter(self.L,self.M,quality)
+      self.K=self.H.shape[1]
+      self.reset()
+
+   def reset(self):
+      #Clears the state, e.g. before a new stream
+      #buffer of the input samples which are still needed, with the index of its first sample:
+      self.buf=None
+      self.bufStart=-(self.K-1)
+      self.numIn=0
+      self.numOut=0
+
+   def outputs(self,n1,n2):
+      #Computes the output samples n1...n2-1 from the buffer, one product per phase
+      L,M,K=self.L,self.M,self.K
+      y=np.empty((max(n2-n1,0),)+self.buf.shape[1:])
+      if n2<=n1 or len(self.buf)<K:
+         return y
+      windows=sliding_window_view(self.buf,K,axis=0)
+      for n0 in range(n1,min(n1+L,n2)):
+         t=n0*M+self.D
+         #index of the window which ends with input sample t//L:
+         start=t//L-(K-1)-self.bufStart
+         R=len(range(n0,n2,L))
+         y[(n0-n1)::L]=np.dot(windows[start:(start+(R-1)*M+1):M],self.H[t%L])
+      return y
+
+   def process(self,x):
+      #Resamples the next block x of the stream
+      #returns the output samples which are complete, of shape (# of samples,) or
+      #(# of samples, # of channels)
+      x=np.asarray(x,dtype=float)
+      if self.buf is None:
+         self.buf=np.zeros((self.K-1,)+x.shape[1:])
+      if self.L==self.M:
+         #the same sampling rate:
+         self.numIn+=len(x)
+         self.numOut=self.numIn
+         return x.copy()
+      self.buf=np.concatenate((self.buf,x),axis=0)
+      self.numIn+=len(x)
+      #output n is complete if its last input sample (n*M+D)//L is available:
+      last=self.numIn*self.L-1-self.D
+      end=last//self.M+1 if last>=0 else 0
+      y=self.outputs(self.numOut,max(end,self.numOut))
+      self.numOut=max(end,self.numOut)
+      #keep the input samples of the window of the next output:
+      first=(self.numOut*self.M+self.D)//self.L-(self.K-1)
+      if first>self.bufStart:
+         self.buf=self.buf[(first-self.bufStart):]
+         self.bufStart=first
+      return y
+
+   def flush(self):
+      #returns the remaining output samples at the end of the stream, with zeros after the
+      #input, such that there are ceil(# of input samples*L/M) output samples in total
+      if self.buf is None:
+         return np.zeros(0)
+      total=-(-self.numIn*self.L//self.M)
+      if total>self.numOut:
+         needed=(total*self.M+self.D)//self.L+1
+         self.buf=np.concatenate((self.buf,np.zeros((needed-self.bufStart-len(self.buf),)+self.buf.shape[1:])),axis=0)
+         y=self.outputs(self.numOut,total)
+      else:
+         y=np.zeros((0,)+self.buf.shape[1:])
+      self.numOut=total
+      return y
+
+def resample(x,fsIn,fsOut,quality='high'):
+   #Converts the sampling rate of the signal x from fsIn to fsOut.
+   #Arguments: x: signal, 1-dim., or multichannel of shape (# of samples, # of channels)
+   #fsIn, fsOut: input and output sampling rates (integers), quality: see resamplingQualities
+   #returns y, the resampled signal of ceil(len(x)*fsOut/fsIn) samples, aligned with x
+   r=Resampler(fsIn,fsOut,quality)
+   return np.concatenate((r.process(x),r.flush()),axis=0)
+
+
+#Testing:
+if __name__ == '__main__':
+   import time
+   #Reference: upsampling with inserted zeros, convolution and downsampling:
+   L,M=3,2
+   H,D=resamplingFilter(L,M,'low')
+   h=np.reshape(H[:,::-1].T,-1)
+   x=np.random.randn(200)
+   u=np.zeros(len(x)*L)
+   u[::L]=x
+   ref=np.convolve(u,h)[D::M][:(-(-len(x)*L//M))]
+   y=resample(x,2,3,'low')
+   print("Error against the reference:", np.max(np.abs(y-ref)))
+   #44.1 to 48 kHz, multichannel, and streaming in blocks of arbitrary length:
+   fs=44100
+   t=np.arange(10*fs)/float(fs)
+   x=np.stack((np.sin(2*np.pi*1000*t),np.sin(2*np.pi*15000*t)),axis=1)
+   start=time.time()
+   y=resample(x,fs,48000)
+   print("10 s stereo from 44.1 to 48 kHz: %.3f s" % (time.time()-start))
+   t=np.arange(len(y))/48000.0
+   ideal=np.stack((np.sin(2*np.pi*1000*t),np.sin(2*np.pi*15000*t)),axis=1)
+   mid=slice(1000,-1000)
+   print("SNR: %.1f dB" % (10*np.log10(np.sum(ideal[mid]**2)/np.sum((y[mid]-ideal[mid])**2))))
+   print("Single channel error:", np.max(np.abs(y[:,0]-resample(x[:,0],fs,48000))))
+   r=Resampler(fs,48000)
+   bounds=np.cumsum(np.random.randint(1,5000,100))
+   ys=[r.process(b) for b in np.split(x,bounds[bounds<len(x)])]+[r.flush()]
+   ys=np.concatenate(ys,axis=0)
+   print("Streaming error:", np.max(np.abs(ys-y)), ys.shape==y.shape)
+   #blocks of single samples, and empty blocks:
+   x1=x[:5000,0]
+   r=Resampler(fs,48000)
+   ys=np.concatenate([r.process(x1[i:(i+1)]) for i in range(len(x1))]+[r.process(x1[:0]),r.flush()])
+   print("Streaming error with blocks of 1 sample:", np.max(np.abs(ys-resample(x1,fs,48000))))
+   print("Empty signal:", resample(np.zeros(0),fs,48000).shape, resample(np.zeros((0,2)),fs,48000).shape)
+   #same sampling rate:
+   print("Same sampling rate identical:", np.array_equal(resample(x,fs,fs),x))
+   #96 to 48 kHz, the aliasing components above 24 kHz are removed:
+   t=np.arange(96000)/96000.0
+   y=resample(np.sin(2*np.pi*30000*t),96000,48000)
+   print("Aliasing at 18 kHz: %.1f dB" % (20*np.log10(np.max(np.abs(y[1000:-1000])))))
@@ -0,0 +1,293 @@
+#Offline benchmarks of the hot paths: MDCT filter bank and its scaling with threads, WAV reading
+#and writing, clipping and energy normalisation, and the Bark masking threshold. All test signals
+#are synthesized locally.
+#The results are written as JSON, which can be compared against a stored baseline:
+#   python benchmarks.py --output results.json
+#   python benchmarks.py --save-baseline benchmark_baseline.json
+#   python benchmarks.py --baseline benchmark_baseline.json --tolerance 0.25
+#With a baseline, the exit code is 1 if a benchmark is slower than the baseline by more than
+#the tolerance, such that it can be used in a CI job. It is also 1 if a cold import of the
+#package exceeds its budget in importBudgets (group 'import'). The imports run outside of the
+#repository, hence they measure the installed package, e.g. after pip install .:
+#   python benchmarks.py --only import
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+import numpy as np
+
+def timeit(func,minTime=0.5,minRepeat=3,maxRepeat=1000):
+   #Calls func repeatedly, at least minRepeat times and until minTime seconds are spent.
+   #returns a dict with the minimum and the median time of a call in seconds and the number of calls.
+   times=[]
+   total=0.0
+   while len(times)<minRepeat or (total<minTime and len(times)<maxRepeat):
+      start=time.perf_counter()
+      func()
+      t=time.perf_counter()-start
+      times.append(t)
+      total+=t
+   return {'min':min(times),'median':float(np.median(times)),'repeat':len(times)}
+
+def peakMemory(func):
+   #returns the peak memory in MB which func allocates, as traced by tracemalloc (numpy arrays included)
+   tracemalloc.start()
+   try:
+      func()
+      peak=tracemalloc.get_traced_memory()[1]
+   finally:
+      tracemalloc.stop()
+   return peak/1e6
+
+def testSignal(numSamples,channels=1,fs=44100,seed=0):
+   #Synthesized test signal between -1 and 1: a chirp, a tone and noise, with a varying envelope.
+   rng=np.random.RandomState(seed)
+   t=np.arange(numSamples)/float(fs)
+   x=np.empty((numSamples,channels))
+   for c in range(channels):
+      chirp=np.sin(2*np.pi*(100.0+2000.0*t/max(t[-1],1e-3))*t)
+      tone=np.sin(2*np.pi*(440.0*(c+1))*t)
+      envelope=0.5+0.5*np.abs(np.sin(2*np.pi*0.5*t))
+      x[:,c]=envelope*(0.4*chirp+0.3*tone+0.1*rng.randn(numSamples))
+   x=np.clip(x,-1.0,1.0)
+   if channels==1:
+      return x[:,0]
+   return x
+
+def writeTestWAV(fileName,x,fs,nbits):
+   #Writes the signal x (samples x channels, between -1 and 1) as a PCM WAV file with nbits bits
+   #with the wave module, independent of AudioIO.wavWrite.
+   x=np.atleast_2d(x.T).T
+   if nbits==8:
+      data=np.round((x+1.0)*127.5).astype(np.uint8).tobytes()
+   elif nbits==24:
+      s=np.round(x*(2**23-1)).astype('<i4')
+      data=np.reshape(s.view(np.uint8).reshape(s.shape+(4,))[...,:3],-1).tobytes()
+   else:
+      s=np.round(x*(2**(nbits-1)-1)).astype('<i%d' % (nbits//8))
+      data=s.tobytes()
+   w=wave.open(fileName,'wb')
+   w.setnchannels(x.shape[1])
+   w.setsampwidth(nbits//8)
+   w.setframerate(fs)
+   w.writeframes(data)
+   w.close()
+
+def benchMDCT(results,quick):
+   from audiocoding.MDCTfb import MDCTanafb, MDCTsynfb
+   Ns=(4,16,64,256,1024,2048)
+   seconds=(1,) if quick else (1,10)
+   for N in Ns:
+      fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+      for sec in seconds:
+         x=testSignal(44100*sec)
+         for backend in ('fft','polmat'):
+            #the reference implementation loops over the blocks and multiplies N x N matrices,
+            #which is too slow for very small and large N:
+            if backend=='polmat' and not (64<=N<=(64 if quick else 256)):
+               continue
+            y=MDCTanafb(x,N,fb,backend=backend)
+            key='MDCTanafb_%s_N%d_%ds' % (backend,N,sec)
+            results[key]=timeit(lambda: MDCTanafb(x,N,fb,backend=backend))
+            key='MDCTsynfb_%s_N%d_%ds' % (backend,N,sec)
+            results[key]=timeit(lambda: MDCTsynfb(y,fb,backend=backend))
+
+def benchMDCTthreads(results,quick):
+   #Scaling of the parallel MDCT with the number of threads, with the speedup against one thread.
+   #The speedup is limited by the number of cores, which is stored in the meta data.
+   from audiocoding.MDCTfb import MDCTanafb, MDCTsynfb
+   N=1024
+   sec=10 if quick else 60
+   fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   x=testSignal(44100*sec,channels=2)
+   y=MDCTanafb(x,N,fb,backend='fft')
+   for name,func in (('MDCTanafb',lambda w: MDCTanafb(x,N,fb,backend='fft',workers=w)),
+                     ('MDCTsynfb',lambda w: MDCTsynfb(y,fb,backend='fft',workers=w))):
+      t1=None
+      for workers in (1,4,8,16):
+         r=timeit(lambda: func(workers))
+         t1=t1 or r['min']
+         r['speedup']=t1/r['min']
+         results['%s_fft_N%d_%ds_threads%d' % (name,N,sec,workers)]=r
+
+def benchWAV(results,quick,tmpDir):
+   from audiocoding.IOMethods import AudioIO
+   fs=44100
+   sec=10 if quick else 60
+   x=testSignal(fs*sec,channels=2)
+   for nbits in (8,16,24,32):
+      fileName=os.path.join(tmpDir,'test%d.wav' % nbits)
+      writeTestWAV(fileName,x,fs,nbits)
+      results['wavRead_%dbit_full' % nbits]=timeit(lambda: AudioIO.wavRead(fileName))
+      results['wavRead_%dbit_full' % nbits]['peakMB']=peakMemory(lambda: AudioIO.wavRead(fileName))
+      results['wavRead_%dbit_segment' % nbits]=timeit(
+         lambda: AudioIO.wavRead(fileName,startSec=sec/2.0,endSec=sec/2.0+5.0))
+      outName=os.path.join(tmpDir,'out%d.wav' % nbits)
+      results['wavWrite_%dbit' % nbits]=timeit(lambda: AudioIO.wavWrite(x,fs,nbits,outName))
+      results['wavWrite_%dbit' % nbits]['peakMB']=peakMemory(lambda: AudioIO.wavWrite(x,fs,nbits,outName))
+
+def benchClipNorm(results,quick):
+   from audiocoding.IOMethods import AudioIO
+   sec=10 if quick else 30
+   x1=1.5*testSignal(44100*sec,seed=1)
+   x2=0.5*testSignal(44100*sec,seed=2)
+   results['twoSideClip_%ds' % sec]=timeit(lambda: AudioIO.twoSideClip(x1,-1.0,1.0,inPlace=False))
+   buf=x1.copy()
+   results['twoSideClip_inPlace_%ds' % sec]=timeit(lambda: AudioIO.twoSideClip(buf,-1.0,1.0))
+   results['energyNormalisation_%ds' % sec]=timeit(lambda: AudioIO.energyNormalisation(x1,x2))
+
+def benchMasking(results,quick):
+   from audiocoding import psyacmodel
+   fs=32000
+   nfft=2048
+   sec=10 if quick else 30
+   x=testSignal(fs*sec,fs=fs)
+   blocks=np.reshape(x[:(len(x)//nfft*nfft)],(-1,nfft))
+   mX=np.abs(np.fft.rfft(blocks,norm='ortho'))
+   for dtype in (np.float64,np.float32):
+      key='maskingThresholds_%s_%ds' % (np.dtype(dtype).name,sec)
+      results[key]=timeit(lambda: psyacmodel.maskingThresholds(mX,fs,nfft,dtype=dtype))
+   #the reference, one frame at a time:
+   W=psyacmodel.mapping2barkmat(fs,64,nfft)
+   W_inv=psyacmodel.mappingfrombarkmat(W,nfft)
+   spreading=psyacmodel.spreadingfunctionmat(psyacmodel.f_SP_dB(fs/2,64),0.8,64)
+   results['maskingThreshold_perframe_%ds' % sec]=timeit(
+      lambda: [psyacmodel.maskingThreshold(m,W,W_inv,fs,spreading,0.8,nfft) for m in mX])
+
+#Budgets of a cold import in a new interpreter: time in seconds, peak memory in MB (as traced
+#by tracemalloc) and modules which must not be imported. The package itself only imports the
+#submodules on first use, and no submodule imports scipy at import time.
+importBudgets={'audiocoding':(0.05,2.0,('numpy','scipy')),
+               'audiocoding.MDCTfb':(1.0,20.0,('scipy',)),
+               'audiocoding.IOMethods':(1.0,20.0,('scipy',)),
+               'audiocoding.psyacmodel':(1.0,20.0,('scipy',)),
+               'audiocoding.perceptualcoder':(1.0,20.0,('scipy',))}
+
+def coldImport(module,memory=False):
+   #Imports module in a new Python interpreter
+   #returns the time of the import in seconds, its peak memory in MB if memory is True
+   #(tracemalloc slows down the import, hence it is measured separately), and the list of
+   #imported top level modules, and the file of the imported module.
+   #The interpreter runs in an empty directory, such that the installed package is imported,
+   #not the one of the repository.
+   code=('import json,sys,time,tracemalloc\n'
+         'if %r: tracemalloc.start()\n'
+         't=time.perf_counter()\n'
+         'import %s as imported\n'
+         't=time.perf_counter()-t\n'
+         'print(json.dumps([t,tracemalloc.get_traced_memory()[1]/1e6,'
+         'sorted(set(m.split(".")[0] for m in sys.modules)),imported.__file__]))' % (memory,module))
+   cwd=tempfile.mkdtemp(prefix='coldimport')
+   try:
+      out=subprocess.run([sys.executable,'-c',code],stdout=subprocess.PIPE,stderr=subprocess.PIPE,cwd=cwd)
+   finally:
+      shutil.rmtree(cwd,ignore_errors=True)
+   if out.returncode!=0:
+      raise RuntimeError('%s cannot be imported outside of the repository, install the package first '
+                         '(pip install .):\n%s' % (module,out.stderr.decode(errors='replace')))
+   return json.loads(out.stdout.decode())
+
+def benchImport(results,quick):
+   #Cold import time and memory of the package and its main submodules, with the violations
+   #of importBudgets in 'overBudget'
+   for module,(maxTime,maxMemory,forbidden) in sorted(importBudgets.items()):
+      times=[coldImport(module)[0] for i in range(1 if quick else 3)]
+      peak,modules,fileName=coldImport(module,memory=True)[1:]
+      over=[]
+      if min(times)>maxTime:
+         over.append('time %.3f s > %g s' % (min(times),maxTime))
+      if peak>maxMemory:
+         over.append('memory %.1f MB > %g MB' % (peak,maxMemory))
+      over+=['imports %s' % m for m in forbidden if m in modules]
+      results['import_%s' % module]={'min':min(times),'median':float(np.median(times)),
+                                      'repeat':len(times),'peakMB':peak,'overBudget':over,
+                                      'file':fileName}
+
+#All benchmark groups, with the names for --only:
+benchGroups=('mdct','threads','wav','clip','masking','import')
+
+def runBenchmarks(groups=benchGroups,quick=False):
+   #Runs the benchmark groups and returns the results as a dict, with the environment in 'meta'.
+   results={}
+   tmpDir=tempfile.mkdtemp(prefix='benchmarks')
+   try:
+      if 'mdct' in groups:
+         benchMDCT(results,quick)
+      if 'threads' in groups:
+         benchMDCTthreads(results,quick)
+      if 'wav' in groups:
+         benchWAV(results,quick,tmpDir)
+      if 'clip' in groups:
+         benchClipNorm(results,quick)
+      if 'masking' in groups:
+         benchMasking(results,quick)
+      if 'import' in groups:
+         benchImport(results,quick)
+   finally:
+      shutil.rmtree(tmpDir,ignore_errors=True)
+   meta={'python':platform.python_version(),'numpy':np.__version__,'platform':platform.platform(),
+         'processor':platform.processor(),'cpus':os.cpu_count(),'quick':quick,'time':time.strftime('%Y-%m-%d %H:%M:%S')}
+   return {'meta':meta,'results':results}
+
+def compareResults(current,baseline,tolerance=0.25):
+   #Compares the minimum times of the benchmarks in both results.
+   #returns a list of (name, baseline time, current time, ratio, regression) for all common benchmarks,
+   #regression is True if the current time is larger than the baseline by more than the tolerance.
+   rows=[]
+   for name in sorted(current['results']):
+      if name not in baseline['results']:
+         continue
+      t0=baseline['results'][name]['min']
+      t1=current['results'][name]['min']
+      ratio=t1/t0 if t0>0 else float('inf')
+      rows.append((name,t0,t1,ratio,ratio>1.0+tolerance))
+   return rows
+
+def main(argv=None):
+   parser=argparse.ArgumentParser(description='Offline benchmarks of the audio coding functions.')
+   parser.add_argument('--output','-o',help='JSON file for the results')
+   parser.add_argument('--baseline','-b',help='JSON file with the baseline results to compare with')
+   parser.add_argument('--save-baseline',help='JSON file to store the results as new baseline')
+   parser.add_argument('--tolerance',type=float,default=0.25,
+                       help='allowed relative slowdown against the baseline (default 0.25)')
+   parser.add_argument('--only',nargs='+',choices=benchGroups,default=list(benchGroups),
+                       help='benchmark groups to run')
+   parser.add_argument('--quick',action='store_true',help='shorter signals and fewer sizes')
+   args=parser.parse_args(argv)
+
+   current=runBenchmarks(args.only,args.quick)
+   for name in sorted(current['results']):
+      r=current['results'][name]
+      print("%-40s %12.6f s (median %.6f s, %d calls)%s" % (name,r['min'],r['median'],r['repeat'],
+            ''.join(', '+f % r[k] for k,f in (('speedup','speedup %.2f'),('peakMB','peak %.1f MB')) if k in r)))
+   #the import budgets are enforced without a baseline:
+   overBudget=[(name,r['overBudget']) for name,r in sorted(current['results'].items()) if r.get('overBudget')]
+   for name,over in overBudget:
+      print("%s over budget: %s" % (name,', '.join(over)))
+   for fileName in (args.output,args.save_baseline):
+      if fileName:
+         with open(fileName,'w') as f:
+            json.dump(current,f,indent=1,sort_keys=True)
+   if args.baseline:
+      with open(args.baseline) as f:
+         baseline=json.load(f)
+      rows=compareResults(current,baseline,args.tolerance)
+      print("\nComparison with %s (tolerance %g):" % (args.baseline,args.tolerance))
+      for name,t0,t1,ratio,regression in rows:
+         print("%-40s %12.6f s -> %12.6f s  x%.2f%s" % (name,t0,t1,ratio,'  REGRESSION' if regression else ''))
+      regressions=sum(r[4] for r in rows)
+      print("%d of %d benchmarks slower than the baseline." % (regressions,len(rows)))
+      if regressions:
+         return 1
+   return 1 if overBudget else 0
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,236 @@
+#Command line tool for the analysis of a corpus of audio files: reads every audio file of a directory,
+#computes the MDCT subbands with MDCTanafb and their masking thresholds with maskingThresholds, and
+#writes them into a feature store. The files are processed in a pool of processes, with a bounded
+#number of files in flight, such that the memory stays bounded for large corpora:
+#   python corpusanalysis.py myCorpusDir myFeatureDir --N 1024 --workers 4
+#The feature store in the output directory consists of one .npy shard per file and feature,
+#  shards/<id>.mdct.npy: MDCT subbands, of shape (N, # of blocks), or (# of channels, N, # of blocks)
+#  shards/<id>.thr.npy: masking thresholds of the subbands, of the same shape,
+#and the index index.jsonl, with one JSON line per finished file. The shards can be opened as
+#memory maps with openShard. An interrupted run is resumed by starting it again with the same
+#directories: files which are in the index, not changed since and analysed with the same
+#parameters are not computed again.
+#With --cache myCacheDir, the MDCT subbands are also stored in the content addressed cache of
+#audiocoding.cache, which is shared by runs with other output directories.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import numpy as np
+
+#File extensions of the audio files which are analysed:
+audioExtensions=('wav','mp3','au','wma','aiff')
+
+def findAudioFiles(inputDir,recursive=True):
+   #returns the sorted list of the paths of the audio files in inputDir, relative to inputDir
+   files=[]
+   for root,dirs,names in os.walk(inputDir):
+      dirs.sort()
+      for name in sorted(names):
+         if os.path.splitext(name)[1][1:].lower() in audioExtensions:
+            files.append(os.path.relpath(os.path.join(root,name),inputDir))
+      if not recursive:
+         break
+   return files
+
+def shardId(relPath):
+   #returns the name of the shards of the file relPath in the store
+   return hashlib.sha1(relPath.encode('utf-8')).hexdigest()
+
+def shardPath(outputDir,entry,feature):
+   #returns the path of the shard of a feature ('mdct' or 'thr') of an index entry
+   return os.path.join(outputDir,'shards','%s.%s.npy' % (entry['id'],feature))
+
+def openShard(outputDir,entry,feature,mmap_mode='r'):
+   #Opens the shard of a feature ('mdct' or 'thr') of an index entry as a read-only memory map.
+   return np.load(shardPath(outputDir,entry,feature),mmap_mode=mmap_mode)
+
+def readIndex(outputDir):
+   #returns the entries of the index of the store as a dict with the relative paths as keys.
+   #A last line which was not completely written when a run was interrupted is ignored.
+   index={}
+   fileName=os.path.join(outputDir,'index.jsonl')
+   if not os.path.exists(fileName):
+      return index
+   with open(fileName) as f:
+      for line in f:
+         try:
+            entry=json.loads(line)
+         except ValueError:
+            continue
+         index[entry['file']]=entry
+   return index
+
+def isFinished(entry,inputDir,outputDir,params):
+   #True if the file of the index entry is unchanged, was analysed with the same parameters
+   #and its shards exist
+   if entry.get('params')!=params:
+      return False
+   try:
+      st=os.stat(os.path.join(inputDir,entry['file']))
+   except OSError:
+      return False
+   return (entry['size']==st.st_size and entry['mtime']==st.st_mtime
+           and all(os.path.exists(shardPath(outputDir,entry,feat)) for feat in ('mdct','thr')))
+
+def saveShard(fileName,a):
+   #Writes the array a as .npy file, first to a temporary file, such that an interrupted
+   #run leaves no incomplete shard.
+   tmpName=fileName+'.%d.tmp' % os.getpid()
+   with open(tmpName,'wb') as f:
+      np.save(f,a)
+   os.replace(tmpName,fileName)
+
+#The Cache of this process for each cache directory and size, such that its size estimate is kept
+#from file to file and the cache directory is not scanned for every file:
+_caches={}
+
+def analyseFile(task):
+   #Analyses one audio file, the task of one process: reads it, computes the MDCT subbands and
+   #their masking thresholds and writes them into the shards.
+   #task: tuple of the input directory, the relative path, the output directory, the parameters,
+   #and the directory and maximum size in bytes of the cache, None without cache
+   #returns the index entry of the file, only small data is sent back to the main process.
+   from audiocoding.cache import Cache, cachedMDCT
+   from audiocoding.psyacmodel import maskingThresholds
+   inputDir,relPath,outputDir,params,cacheParams=task
+   path=os.path.join(inputDir,relPath)
+   st=os.stat(path)
+   start=time.time()
+   dtype=np.dtype(params['dtype']).type
+   N=params['N']
+   if params['coeffs'] is None:
+      #sine window:
+      fb=np.sin(np.pi/(2*N)*(np.arange(int(1.5*N))+0.5))
+   else:
+      fb=np.loadtxt(params['coeffs'])
+   cache=None
+   if cacheParams:
+      cache=_caches.get(cacheParams)
+      if cache is None:
+         cache=_caches[cacheParams]=Cache(*cacheParams)
+   y,fs=cachedMDCT(path,N,fb,cache,mono=params['mono'],dtype=dtype)
+   #The masking thresholds of the MDCT spectra, which have N subbands like a DFT of length 2N
+   #up to the Nyquist frequency:
+   mX=np.swapaxes(np.abs(y),-1,-2)
+   mT=maskingThresholds(mX,fs,2*N,params['nfilts'],params['alpha'],dtype=dtype)[...,:N]
+   mT=np.swapaxes(mT,-1,-2)
+   entry={'file':relPath,'id':shardId(relPath),'size':st.st_size,'mtime':st.st_mtime,
+          'fs':fs,'shape':list(y.shape),'params':params,'seconds':time.time()-start}
+   saveShard(shardPath(outputDir,entry,'mdct'),y)
+   saveShard(shardPath(outputDir,entry,'thr'),mT)
+   return entry
+
+def analyseTask(task):
+   #analyseFile, which returns the error message instead of raising an exception,
+   #such that one broken file does not stop the run.
+   try:
+      return analyseFile(task),None
+   except Exception as e:
+      return None,'%s: %s' % (task[1],e)
+
+def analyseCorpus(inputDir,outputDir,params,workers=None,maxInFlight=None,recursive=True,log=None,
+                  cache=None):
+   #Analyses all audio files in inputDir which are not yet finished in the store in outputDir.
+   #params: dict with N, coeffs (file of the MDCT coefficients, None for a sine window), mono,
+   #dtype, nfilts and alpha. The hash of the coefficients is added as coeffsHash.
+   #workers: number of processes, the number of CPUs if None, 1 computes in this process
+   #maxInFlight: maximum number of files which are submitted to the pool at the same time,
+   #2*workers if None
+   #log: function for progress messages, e.g. print
+   #cache: tuple of the directory and the maximum size in bytes of a Cache of audiocoding.cache,
+   #None to compute without cache
+   #returns the numbers of analysed, skipped and failed files
+   if params.get('coeffs') is not None:
+      #the hash of the coefficients, such that the files are analysed again if the coefficient
+      #file is changed, also under the same name:
+      from audiocoding.cache import hashArray
+      params=dict(params,coeffsHash=hashArray(np.loadtxt(params['coeffs'])))
+   os.makedirs(os.path.join(outputDir,'shards'),exist_ok=True)
+   index=readIndex(outputDir)
+   files=findAudioFiles(inputDir,recursive)
+   todo=[f for f in files if not (f in index and isFinished(index[f],inputDir,outputDir,params))]
+   skipped=len(files)-len(todo)
+   if log:
+      log("%d files, %d already finished, %d to analyse" % (len(files),skipped,len(todo)))
+   tasks=((inputDir,f,outputDir,params,cache) for f in todo)
+   done=0
+   failed=0
+   with open(os.path.join(outputDir,'index.jsonl'),'a+') as indexFile:
+      #terminate a line which was not completely written by an interrupted run:
+      if indexFile.tell()>0:
+         indexFile.seek(indexFile.tell()-1)
+         if indexFile.read(1)!='\n':
+            indexFile.write('\n')
+      for entry,error in runTasks(tasks,workers,maxInFlight):
+         if error is not None:
+            failed+=1
+            if log:
+               log("failed: "+error)
+            continue
+         #only the main process writes the index, one complete line per finished file:
+         indexFile.write(json.dumps(entry,sort_keys=True)+'\n')
+         indexFile.flush()
+         os.fsync(indexFile.fileno())
+         done+=1
+         if log:
+            log("[%d/%d] %s (%.2f s)" % (done+failed,len(todo),entry['file'],entry['seconds']))
+   return done,skipped,failed
+
+def runTasks(tasks,workers=None,maxInFlight=None):
+   #Generator of the results of analyseTask for the tasks, in the order of their completion.
+   #At most maxInFlight tasks are submitted to the process pool at the same time.
+   if workers==1:
+      for task in tasks:
+         yield analyseTask(task)
+      return
+   from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+   if workers is None:
+      workers=os.cpu_count() or 1
+   if maxInFlight is None:
+      maxInFlight=2*workers
+   with ProcessPoolExecutor(max_workers=workers) as pool:
+      pending=set()
+      for task in tasks:
+         if len(pending)>=maxInFlight:
+            finished,pending=wait(pending,return_when=FIRST_COMPLETED)
+            for future in finished:
+               yield future.result()
+         pending.add(pool.submit(analyseTask,task))
+      while pending:
+         finished,pending=wait(pending,return_when=FIRST_COMPLETED)
+         for future in finished:
+            yield future.result()
+
+def main(argv=None):
+   parser=argparse.ArgumentParser(description='MDCT and masking threshold analysis of a corpus of audio files.')
+   parser.add_argument('inputDir',help='directory with the audio files')
+   parser.add_argument('outputDir',help='directory of the feature store')
+   parser.add_argument('--N',type=int,default=1024,help='number of MDCT subbands (default 1024)')
+   parser.add_argument('--coeffs',help='text file with the 1.5N MDCT coefficients (default: sine window)')
+   parser.add_argument('--mono',action='store_true',help='convert the files to mono')
+   parser.add_argument('--dtype',choices=('float64','float32'),default='float64',
+                       help='precision of the computation and the shards')
+   parser.add_argument('--nfilts',type=int,default=64,help='number of Bark subbands (default 64)')
+   parser.add_argument('--alpha',type=float,default=0.8,
+                       help='exponent of the superposition of the spreading functions (default 0.8)')
+   parser.add_argument('--workers',type=int,help='number of processes (default: number of CPUs)')
+   parser.add_argument('--max-in-flight',type=int,help='maximum number of files in the pool (default 2*workers)')
+   parser.add_argument('--no-recursive',action='store_true',help='do not analyse subdirectories')
+   parser.add_argument('--cache',help='directory of a cache for the MDCT subbands')
+   parser.add_argument('--cache-size',type=float,default=10.0,help='maximum size of the cache in GB (default 10)')
+   args=parser.parse_args(argv)
+
+   params={'N':args.N,'coeffs':args.coeffs and os.path.abspath(args.coeffs),'mono':args.mono,
+           'dtype':args.dtype,'nfilts':args.nfilts,'alpha':args.alpha}
+   done,skipped,failed=analyseCorpus(args.inputDir,args.outputDir,params,args.workers,
+                                     args.max_in_flight,not args.no_recursive,log=print,
+                                     cache=args.cache and (args.cache,int(args.cache_size*2**30)))
+   print("Analysed %d files, skipped %d finished files, %d failed." % (done,skipped,failed))
+   return 1 if failed else 0
+
+if __name__ == '__main__':
+   sys.exit(main())